@@ -52,6 +52,12 @@ test() {
   pytest
 }
 
+# @cmd Run benchmarks and compare the results with the stored baselines
+# @arg args* Arguments for benchmarks/suite.py (e.g. '--update' to store the new baselines)
+bench() {
+  python benchmarks/suite.py "$@"
+}
+
 # Install Java (meant for Github Actions)
 jython.ensure_java() {
   if loc=$(command -v java 2>&1); then
@@ -0,0 +1,55 @@
+# coding: utf-8
+"""Compare peak memory and time of loading a large introspection file: whole document vs streamed ingest.
+
+Usage: python benchmarks/bench_ingest.py [TYPES] [FIELDS_PER_TYPE]
+"""
+from __future__ import print_function, unicode_literals
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from synthetic import generate_schema
+from gqlspection import GQLSchema
+
+
+def load_whole(path):
+    with open(path) as f:
+        return GQLSchema(json=json.loads(f.read()))
+
+
+def load_streamed(path):
+    with open(path, 'rb') as f:
+        return GQLSchema(stream=f)
+
+
+def measure(load, path):
+    gc.collect()
+    tracemalloc.start()
+    started = time.time()
+    schema = load(path)
+    elapsed = time.time() - started
+    gc.collect()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del schema
+    return elapsed, size, peak
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:3]]
+    fd, path = tempfile.mkstemp(suffix='.json')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(generate_schema(*args), f)
+
+    try:
+        print("file: {size:.1f} MiB".format(size=os.path.getsize(path) / 1024.0 / 1024))
+        for name, load in (('whole document', load_whole), ('streamed', load_streamed)):
+            elapsed, size, peak = measure(load, path)
+            print("{name:>15}: {elapsed:.2f}s, model {size:.1f} MiB, peak {peak:.1f} MiB".format(
+                name=name, elapsed=elapsed, size=size / 1024.0 / 1024, peak=peak / 1024.0 / 1024))
+    finally:
+        os.remove(path)
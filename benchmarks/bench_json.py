@@ -0,0 +1,36 @@
+# coding: utf-8
+"""Compare load times of available JSON backends on a large synthetic introspection dump.
+
+Usage: python benchmarks/bench_json.py [TYPES] [FIELDS_PER_TYPE]
+"""
+from __future__ import print_function, unicode_literals
+import json
+import sys
+import time
+
+from synthetic import generate_schema
+from gqlspection import json_backend
+
+
+def measure(data, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.time()
+        json_backend.loads(data)
+        elapsed = time.time() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:3]]
+    data = json.dumps(generate_schema(*args)).encode('utf-8')
+    print("document: {size:.1f} MiB".format(size=len(data) / 1024.0 / 1024))
+
+    selected = json_backend.name
+    try:
+        for backend in json_backend.available():
+            json_backend.select(backend)
+            print("{backend:>8}: {elapsed:.3f}s".format(backend=backend, elapsed=measure(data)))
+    finally:
+        json_backend.select(selected)
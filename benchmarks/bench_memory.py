@@ -0,0 +1,34 @@
+# coding: utf-8
+"""Measure memory used by the parsed schema object model (bytes per field) on a synthetic large schema.
+
+Usage: python benchmarks/bench_memory.py [TYPES] [FIELDS_PER_TYPE]
+"""
+from __future__ import print_function, unicode_literals
+import gc
+import sys
+import tracemalloc
+
+from synthetic import generate_schema
+from gqlspection import GQLSchema
+
+
+def measure(types=10000, fields_per_type=10):
+    json = generate_schema(types=types, fields_per_type=fields_per_type)
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    schema = GQLSchema(json=json)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    fields = sum(len(t.fields) for t in schema.types)
+    return after - before, fields
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:3]]
+    size, fields = measure(*args)
+    print("schema model: {size:.1f} MiB, {fields} fields, {per_field:.0f} bytes per field".format(
+        size=size / 1024.0 / 1024, fields=fields, per_field=float(size) / fields))
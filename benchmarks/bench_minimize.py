@@ -0,0 +1,64 @@
+# coding: utf-8
+"""Measure minimize_query() throughput on multi-MB documents of generated operations.
+
+The previous character-by-character implementation is included for comparison.
+
+Usage: python benchmarks/bench_minimize.py [TYPES] [FIELDS_PER_TYPE]
+"""
+from __future__ import print_function, unicode_literals
+import sys
+import time
+
+from synthetic import generate_schema
+from gqlspection import GQLSchema
+from gqlspection.utils import minimize_query
+
+
+def legacy_minimize_query(query):
+    minimized = ""
+    in_comment = in_single_string = in_double_string = in_string = in_space = escaped = False
+    for c in query.strip():
+        if c == "#" and not in_string:
+            in_comment = True
+        if in_string:
+            minimized += c
+        elif not in_comment:
+            if in_space:
+                if not c.isspace():
+                    minimized += " " + c
+            elif not c.isspace():
+                minimized += c
+        in_space = c.isspace()
+        if not in_string and (c == "\n"):
+            in_comment = False
+        if not in_comment and not escaped:
+            in_double_string = not in_double_string if c == '"' else in_double_string
+            in_single_string = not in_single_string if c == "'" else in_single_string
+        in_string = in_single_string or in_double_string
+        escaped = (c == "\\")
+    return minimized
+
+
+def measure(minimize, document, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.time()
+        minimize(document)
+        elapsed = time.time() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:3]]
+    schema = GQLSchema(json=generate_schema(*args))
+    operations = '\n'.join(op.str() for op in schema.iter_operations(max_reentries=0))
+
+    for copies in (1, 2, 4):
+        document = '\n'.join([operations] * copies)
+        size = len(document) / 1024.0 / 1024
+        print("document: {size:.1f} MiB".format(size=size))
+        for name, minimize in (('current', minimize_query), ('legacy', legacy_minimize_query)):
+            elapsed = measure(minimize, document)
+            print("{name:>10}: {elapsed:.3f}s ({speed:.1f} MiB/s)".format(
+                name=name, elapsed=elapsed, speed=size / elapsed))
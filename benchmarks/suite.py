@@ -0,0 +1,180 @@
+# coding: utf-8
+"""Benchmark suite on synthetic large schemas, compared against the stored baselines.
+
+Every case is run several times and the best time is kept. Times are divided by the duration of a fixed calibration
+loop (measured right before each case), so that the baselines (benchmarks/baselines.json) stay comparable across
+machines of different speed. A case that gets slower than its baseline by more than the tolerance is reported as a
+regression and the suite exits with 1. Short cases (NOISY) are run four times as often and allowed twice the tolerance,
+as their times vary the most between runs.
+
+Usage: python benchmarks/suite.py [--update] [--tolerance PERCENT] [--repeat N] [CASE ...]
+
+  --update     store the current results as the new baselines (after an intended change in performance)
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+from click.testing import CliRunner
+
+from synthetic import generate_schema
+import gqlspection
+from gqlspection import GQLSchema
+from gqlspection.cli import cli
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+# schemas are fixed, so that results stay comparable with the baselines
+LARGE  = dict(types=2000, fields_per_type=20, seed=1, nesting=2, enums=50, input_objects=50)
+RENDER = dict(types=300, fields_per_type=10, seed=2, nesting=2, enums=20, input_objects=20)
+# number of root fields (and the depth) of generated queries in the render cases
+RENDER_QUERIES = 100
+RENDER_DEPTH   = 4
+# cases that only take tens of milliseconds, their results are the most sensitive to the noise of the machine
+NOISY = ('proxy resolution', 'render (pad=4)', 'render (pad=0)', 'render (pad=None)')
+
+
+def calibrate():
+    """Duration of a fixed pure Python loop, the unit all results are expressed in."""
+    def loop():
+        total = 0
+        for i in range(200000):
+            total += i % 7
+        return total
+    return best_of(10, loop)
+
+
+def best_of(repeat, run, setup=None):
+    """Best time of 'repeat' runs, with the garbage collector disabled while timing (as timeit does)."""
+    best = None
+    for _ in range(repeat):
+        argument = setup() if setup else None
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            run(argument) if setup else run()
+            elapsed = time.perf_counter() - started
+        finally:
+            gc.enable()
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def unlinked_schema(data):
+    """Load the schema without the link pass, type references are left as GQLTypeProxy objects."""
+    schema = GQLSchema.__new__(GQLSchema)
+    schema.render_cache = gqlspection.GQLRenderCache()
+    schema._kinds       = {}
+    schema._proxies     = {}
+    original_schema     = schema._get_original_schema(data)
+    schema.types        = gqlspection.GQLTypes(schema, original_schema)
+    schema.query        = schema._extract_query_type(original_schema)
+    schema.mutation     = schema._extract_mutation_type(original_schema)
+    return schema
+
+
+def render_all(schema, pad):
+    schema.render_cache.clear()
+    for field in list(schema.query.fields)[:RENDER_QUERIES]:
+        schema.generate_query(field, max_depth=RENDER_DEPTH).str(pad)
+
+
+def build_cases(repeat):
+    """Return an ordered dict of 'name: function measuring the best time of the case'."""
+    large      = generate_schema(**LARGE)
+    large_text = json.dumps(large)
+    render     = GQLSchema(json=generate_schema(**RENDER))
+
+    fd, path = tempfile.mkstemp(suffix='.json')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(generate_schema(**RENDER), f)
+
+    def run_cli():
+        result = CliRunner().invoke(cli, ['-f', path, '--no-cache', '-d', str(RENDER_DEPTH)])
+        if result.exit_code != 0:
+            raise Exception("CLI failed: %s" % result.output)
+
+    noisy = repeat * 4
+    cases = OrderedDict()
+    cases['parse (string)'] = lambda: best_of(repeat, lambda: GQLSchema(json=large_text))
+    cases['parse (dict)']   = lambda: best_of(repeat, lambda: GQLSchema(json=large))
+    cases['proxy resolution'] = lambda: best_of(noisy, lambda schema: schema._link(), lambda: unlinked_schema(large))
+    for pad in (4, 0, None):
+        cases['render (pad=%s)' % pad] = (lambda pad: lambda: best_of(noisy, lambda: render_all(render, pad)))(pad)
+    cases['cli end-to-end'] = lambda: best_of(repeat, run_cli)
+    return cases, path
+
+
+def compare(results, baselines, tolerance):
+    """Print the results next to the baselines, return the names of regressed cases (NOISY cases are allowed twice
+    the tolerance)."""
+    regressions = []
+    print("{case:<20} {result:>10} {baseline:>10} {change:>8}".format(
+        case='case', result='result', baseline='baseline', change='change'))
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            print("{name:<20} {result:>10.2f} {baseline:>10} {change:>8}".format(
+                name=name, result=result, baseline='-', change='-'))
+            continue
+        change = (result - baseline) / baseline * 100
+        regressed = change > (tolerance * 2 if name in NOISY else tolerance)
+        if regressed:
+            regressions.append(name)
+        print("{name:<20} {result:>10.2f} {baseline:>10.2f} {change:>+7.1f}%{mark}".format(
+            name=name, result=result, baseline=baseline, change=change, mark='  <-- REGRESSION' if regressed else ''))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('cases', nargs='*', help="names of the cases to run (all by default)")
+    parser.add_argument('--update', action='store_true', help="store the results as the new baselines")
+    parser.add_argument('--tolerance', type=float, default=30.0,
+                        help="allowed slowdown in percent (default 30, doubled for short cases)")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="number of runs of each case (default 5, four times as many for short cases)")
+    args = parser.parse_args(argv)
+
+    cases, path = build_cases(args.repeat)
+    results = OrderedDict()
+    try:
+        for name, measure in cases.items():
+            if not args.cases or name in args.cases:
+                # calibrated right before each case, to follow changes in the speed of the machine (e.g. CPU scaling)
+                unit = calibrate()
+                results[name] = measure() / unit
+    finally:
+        os.remove(path)
+
+    baselines = {}
+    if os.path.exists(BASELINES):
+        with open(BASELINES) as f:
+            baselines = json.load(f)
+
+    if args.update:
+        baselines.update(results)
+        with open(BASELINES, 'w') as f:
+            json.dump(OrderedDict(sorted(baselines.items())), f, indent=2)
+            f.write('\n')
+        print("Baselines updated: %s" % BASELINES)
+        return 0
+
+    print("Results in units of the calibration loop:")
+    regressions = compare(results, baselines, args.tolerance)
+    if regressions:
+        print("\nPERFORMANCE REGRESSION (more than %d%% slower than the baseline, %d%% for short cases): %s" % (
+            args.tolerance, args.tolerance * 2, ', '.join(regressions)), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+# coding: utf-8
+"""Deterministic generator of synthetic introspection results, meant for benchmarking on large schemas."""
+from __future__ import unicode_literals
+import random
+
+SCALARS = ('String', 'Int', 'Float', 'Boolean', 'ID')
+
+
+def type_ref(name, kind, modifiers=()):
+    """Build a (possibly wrapped) type reference, modifiers are listed outermost first, e.g. ('NON_NULL', 'LIST')."""
+    ref = {'kind': kind, 'name': name, 'ofType': None}
+    for modifier in reversed(modifiers):
+        ref = {'kind': modifier, 'name': None, 'ofType': ref}
+    return ref
+
+
+def modifier_choices(nesting):
+    """All valid combinations of LIST / NON_NULL wrappers with up to 'nesting' levels of lists, e.g. ('NON_NULL', 'LIST')."""
+    choices = wrapped = [(), ('NON_NULL',)]
+    for _ in range(nesting):
+        wrapped = [outer + ('LIST',) + inner for inner in wrapped for outer in ((), ('NON_NULL',))]
+        choices = choices + wrapped
+    return choices
+
+
+def input_value(name, ref):
+    return {'name': name, 'description': None, 'type': ref, 'defaultValue': None}
+
+
+def enum_type(name, values=5):
+    return {
+        'kind': 'ENUM',
+        'name': name,
+        'description': None,
+        'fields': None,
+        'inputFields': None,
+        'interfaces': None,
+        'enumValues': [
+            {'name': 'VALUE%d' % i, 'description': None, 'isDeprecated': False, 'deprecationReason': None}
+            for i in range(values)
+        ],
+        'possibleTypes': None
+    }
+
+
+def input_object_types(names, rng, modifiers):
+    result = []
+    for position, name in enumerate(names):
+        # only input objects defined later are nested, so that input types stay acyclic
+        fields = [input_value('value%d' % i, type_ref(rng.choice(SCALARS), 'SCALAR', rng.choice(modifiers)))
+                  for i in range(3)]
+        if position + 1 < len(names):
+            fields.append(input_value('nested', type_ref(rng.choice(names[position + 1:]), 'INPUT_OBJECT')))
+        result.append({
+            'kind': 'INPUT_OBJECT',
+            'name': name,
+            'description': None,
+            'fields': None,
+            'inputFields': fields,
+            'interfaces': None,
+            'enumValues': None,
+            'possibleTypes': None
+        })
+    return result
+
+
+def generate_schema(types=100, fields_per_type=10, seed=0, fan_out=0.5, cycle_density=1.0, nesting=1, enums=0,
+                    input_objects=0):
+    """Generate an introspection result (as returned by the server) with 'types' object types.
+
+    Every object type gets 'fields_per_type' fields:
+
+      - 'fan_out'        share of fields referencing other object types (the rest are scalars or enums)
+      - 'cycle_density'  probability that a reference may point to any object type, including the current one and the
+                         ones defined before it (which makes the schema cyclic). Otherwise only types defined later
+                         are referenced, 0 generates an acyclic schema.
+      - 'nesting'        maximum number of nested lists in type references (wrappers are chosen randomly, up to e.g.
+                         [[Type!]!]! for 'nesting=2')
+      - 'enums'          number of enum types (with 5 values each), referenced by some of the leaf fields
+      - 'input_objects'  number of input object types, used as field arguments
+
+    The same arguments always produce the same schema.
+    """
+    rng = random.Random(seed)
+    names = ['Type%d' % i for i in range(types)]
+    enum_names = ['Enum%d' % i for i in range(enums)]
+    input_names = ['Input%d' % i for i in range(input_objects)]
+    modifiers = modifier_choices(nesting)
+
+    def object_field(position):
+        if rng.random() < cycle_density:
+            target = rng.choice(names)
+        elif position + 1 < len(names):
+            target = rng.choice(names[position + 1:])
+        else:
+            # nothing is defined after the last type
+            return leaf_field()
+        return type_ref(target, 'OBJECT', rng.choice(modifiers))
+
+    def leaf_field():
+        if enum_names and rng.random() < 0.2:
+            return type_ref(rng.choice(enum_names), 'ENUM', rng.choice(modifiers))
+        return type_ref(rng.choice(SCALARS), 'SCALAR', rng.choice(modifiers))
+
+    def field_args(i):
+        args = []
+        if i % 3 == 0:
+            args.append(input_value('arg', type_ref('Int', 'SCALAR')))
+        if input_names and i % 4 == 0:
+            args.append(input_value('input', type_ref(rng.choice(input_names), 'INPUT_OBJECT', ('NON_NULL',))))
+        return args
+
+    schema_types = []
+    for position, name in enumerate(names):
+        schema_types.append({
+            'kind': 'OBJECT',
+            'name': name,
+            'description': 'Synthetic type %s.' % name,
+            'fields': [
+                {
+                    'name': 'field%d' % i,
+                    'description': None,
+                    'args': field_args(i),
+                    'type': object_field(position) if rng.random() < fan_out else leaf_field(),
+                    'isDeprecated': False,
+                    'deprecationReason': None
+                } for i in range(fields_per_type)
+            ],
+            'inputFields': None,
+            'interfaces': [],
+            'enumValues': None,
+            'possibleTypes': None
+        })
+
+    schema_types += [enum_type(name) for name in enum_names]
+    schema_types += input_object_types(input_names, rng, modifiers)
+
+    schema_types.append({
+        'kind': 'OBJECT',
+        'name': 'Query',
+        'fields': [
+            {'name': name[0].lower() + name[1:], 'args': [], 'type': type_ref(name, 'OBJECT')}
+            for name in names
+        ]
+    })
+
+    return {'data': {'__schema': {
+        'queryType': {'name': 'Query'},
+        'mutationType': None,
+        'types': schema_types
+    }}}
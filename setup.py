@@ -63,7 +63,12 @@ setup(
         "future;   python_version == '2.7'"
     ],
     extras_require={
-        "cli": ["click", "requests"]
+        "cli": ["click", "requests"],
+        # faster JSON decoding and brotli-compressed responses (used automatically when installed)
+        "fast": [
+            "orjson; python_version >= '3.7' and platform_python_implementation != 'Jython'",
+            "brotli; platform_python_implementation != 'Jython'"
+        ]
     },
     entry_points={
         "console_scripts": [
@@ -5,11 +5,7 @@ import gqlspection
 
 
 class GQLArg(object):
-    name         = ''
-    kind         = None
-    description  = ''
-    type         = None
-    default_value = ''
+    __slots__ = ('name', 'kind', 'description', 'type', 'default_value')
 
     def __init__(self, name, kind, type_, description='', default_value=''):
         self.name = name
@@ -20,12 +16,12 @@ class GQLArg(object):
 
     @staticmethod
     def from_json(json, schema):
-        kind = gqlspection.GQLTypeKind.from_json(json['type'])
+        kind = gqlspection.GQLTypeKind.from_json(json['type'], schema)
 
         return GQLArg(
             name=json['name'],
             kind=kind,
-            type_=gqlspection.GQLTypeProxy(kind.name, schema),
+            type_=gqlspection.GQLTypeProxy.for_name(kind.name, schema),
             description=json.get('description', ''),
             default_value=json.get('default_value', '')
         )
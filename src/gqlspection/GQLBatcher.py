@@ -0,0 +1,91 @@
+# coding: utf-8
+from __future__ import unicode_literals
+from builtins import object, str
+from collections import OrderedDict
+from copy import copy
+import gqlspection
+
+
+class GQLBatcher(object):
+    """Packs root fields of many operations into few operations, so that they can be sent in fewer requests.
+
+      - 'batch_size'  maximum number of root fields in a single operation (None is unlimited)
+      - 'max_bytes'   maximum size of an operation in bytes, as rendered by GQLWriter with the provided 'pad'
+      - 'max_fields'  maximum number of fields selected within an operation
+
+    Every root field is selected under a unique alias ('user_0', 'user_1', ...), so the same field may appear several
+    times in a batch (e.g. parts of a split operation). Queries and mutations are batched separately. Operations that
+    exceed the size limits on their own get split first (see GQLQuery.split), batched operations are rendered inline,
+    without fragments.
+    """
+    batch_size = 50
+    max_bytes  = None
+    max_fields = None
+    pad        = 4
+
+    def __init__(self, batch_size=50, max_bytes=None, max_fields=None, pad=4):
+        self.batch_size = batch_size
+        self.max_bytes  = max_bytes
+        self.max_fields = max_fields
+        self.pad        = pad
+
+    def batch(self, operations):
+        """Lazily pack the operations (GQLQuery objects), a batch is yielded as soon as it's full."""
+        limited  = self.max_bytes is not None or self.max_fields is not None
+        splitter = gqlspection.GQLSplitter(self.max_bytes, self.max_fields, self.pad) if limited else None
+        # open batches by the operation type: [operation the batch is based on, root fields, size in bytes, fields]
+        batches  = OrderedDict()
+
+        for operation in operations:
+            parts = operation.split(self.max_bytes, self.max_fields, self.pad) if limited else [operation]
+            for part in parts:
+                key = (part.operation, part.type.name)
+                for node in part.selection().selections:
+                    batch = batches.get(key)
+                    if batch is not None and not self._fits(batch, node, splitter):
+                        yield self._operation(batch)
+                        batch = None
+                    if batch is None:
+                        batch = batches[key] = [part, [], self._overhead(part), 0]
+                    self._add(batch, node, splitter)
+
+        for batch in batches.values():
+            yield self._operation(batch)
+
+    def _overhead(self, operation):
+        """Size of the batched operation without root fields: the header and the closing brace."""
+        if self.max_bytes is None:
+            return 0
+        writer = gqlspection.GQLWriter(self.pad)
+        return len(writer.format(operation.operation + writer.SPACE + '{').encode('utf-8')) + 1
+
+    def _aliased(self, batch, node):
+        table = batch[0].type.schema._selections
+        return node.with_alias(table, '{name}_{index}'.format(name=node.name, index=str(len(batch[1]))))
+
+    def _fits(self, batch, node, splitter):
+        if self.batch_size is not None and len(batch[1]) >= self.batch_size:
+            return False
+        if splitter is None:
+            return True
+        size, fields = splitter.size(self._aliased(batch, node), 1)
+        return splitter.fits((batch[2] + size, batch[3] + fields), (self.max_bytes, self.max_fields))
+
+    def _add(self, batch, node, splitter):
+        node = self._aliased(batch, node)
+        batch[1].append(node)
+        if splitter is not None:
+            size, fields = splitter.size(node, 1)
+            batch[2] += size
+            batch[3] += fields
+
+    @staticmethod
+    def _operation(batch):
+        base, nodes = batch[0], batch[1]
+        operation = copy(base)
+        operation.name        = ''
+        operation.description = ''
+        operation.fragments   = False
+        operation._selection  = gqlspection.GQLSelection.intern(
+            base.type.schema._selections, base.operation, (), base.type.name, tuple(nodes))
+        return operation
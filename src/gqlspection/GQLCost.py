@@ -0,0 +1,204 @@
+# coding: utf-8
+from __future__ import unicode_literals
+from builtins import object
+
+
+class GQLCost(object):
+    """Estimates how expensive it is for the server to resolve a selection tree (see GQLSelection).
+
+    Cost of a field is its weight, plus the cost of its selection set multiplied by the expected number of items for
+    every LIST wrapper of the field type, so that nested lists grow the cost exponentially (as they do on the server):
+
+      - 'list_multiplier'   expected number of items of a list (10 by default)
+      - 'list_multipliers'  overrides of the multiplier for particular fields, e.g. {'User.friends': 50}
+      - 'type_weights'      weights of fields by their type name, e.g. {'Repository': 5}
+      - 'default_weight'    weight of the rest of the fields (1 by default)
+
+    Identical subtrees are shared (see GQLSelection), so each of them is estimated only once.
+    """
+    list_multiplier  = 10
+    list_multipliers = None
+    type_weights     = None
+    default_weight   = 1
+
+    def __init__(self, list_multiplier=10, list_multipliers=None, type_weights=None, default_weight=1):
+        self.list_multiplier  = list_multiplier
+        self.list_multipliers = list_multipliers or {}
+        self.type_weights     = type_weights or {}
+        self.default_weight   = default_weight
+
+    def __repr__(self):
+        return "GQLCost(list_multiplier={multiplier}, default_weight={weight})".format(
+            multiplier=self.list_multiplier, weight=self.default_weight)
+
+    def weight(self, node):
+        return self.type_weights.get(node.type, self.default_weight)
+
+    def multiplier(self, parent_type, node):
+        """Expected number of items of the field (1 unless the type is a list, nested lists multiply)."""
+        lists = node.modifiers.count('LIST')
+        if not lists:
+            return 1
+        key = '{type}.{field}'.format(type=parent_type, field=node.name)
+        return self.list_multipliers.get(key, self.list_multiplier) ** lists
+
+    def estimate(self, node, parent_type=None, memo=None):
+        """Estimated cost of the field node selected on the 'parent_type' (name of the type it's a field of).
+
+        'memo' (a dict) keeps costs of the subtrees between calls, it's only valid for a single GQLCost object.
+        """
+        memo = {} if memo is None else memo
+        # post-order walk with an explicit stack, a node is estimated once costs of all of its children are known
+        stack = [(parent_type, node)]
+        while stack:
+            key = stack[-1]
+            if key in memo:
+                stack.pop()
+                continue
+            owner, current = key
+            children = [(current.type, child) for child in current.selections or ()]
+            pending = [child for child in children if child not in memo]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            memo[key] = self.weight(current) + self.multiplier(owner, current) * sum(memo[child] for child in children)
+        return memo[(parent_type, node)]
+
+    def total(self, operation, memo=None):
+        """Estimated cost of the operation (the operation node itself is free, only its fields count)."""
+        memo = {} if memo is None else memo
+        return sum(self.estimate(node, operation.type, memo) for node in operation.selections)
+
+    def prune(self, operation, budget, table):
+        """Remove branches of the operation until its estimated cost fits the budget.
+
+        Every step removes a single field: the most expensive one that doesn't save more than the excess over the
+        budget, or the cheapest one that covers the excess if there's no such field, so the result ends up as close to
+        the budget as possible. Expensive deep nested lists are cut before cheap top level fields. One field of every
+        selection set (the one that can be pruned the most) is never removed, so the result is always valid and can
+        get as cheap as the operation can be, but it may still exceed the budget. 'table' is the intern table of the
+        nodes.
+        """
+        memo   = {}
+        ranges = {}
+        cost = self.total(operation, memo)
+        while cost > budget:
+            path = self._removal_path(operation, cost - budget, memo, ranges)
+            if path is None:
+                break
+            operation = self._remove(path, table)
+            cost = self.total(operation, memo)
+        return operation
+
+    def savings(self, node, parent_type=None, memo=None, ranges=None):
+        """Return '(smallest, largest)' cost saved by removing a single field within the subtree of the node (at the
+        scale of the node itself, see estimate), None if there's nothing to remove.
+
+        'memo' keeps estimated costs and 'ranges' the results, both are only valid for a single GQLCost object.
+        """
+        return self._range(node, parent_type, {} if memo is None else memo, {} if ranges is None else ranges)[1]
+
+    def _range(self, node, parent_type, memo, ranges):
+        """Return '(smallest cost the node can be pruned to, savings)' of the node, see savings()."""
+        stack = [(parent_type, node)]
+        while stack:
+            key = stack[-1]
+            if key in ranges:
+                stack.pop()
+                continue
+            owner, current = key
+            children = [(current.type, child) for child in current.selections or ()]
+            pending = [child for child in children if child not in ranges]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            multiplier = self.multiplier(owner, current)
+            minimum    = min(ranges[child][0] for child in children) if children else 0
+            bounds     = [ranges[child][1] for child in children if ranges[child][1] is not None]
+            keeper     = self._keeper(current, memo, ranges)
+            bounds.extend((cost, cost) for cost in (self.estimate(child, current.type, memo)
+                                                    for index, child in enumerate(current.selections or ())
+                                                    if index != keeper))
+            ranges[key] = (self.weight(current) + multiplier * minimum,
+                           (multiplier * min(low for low, _ in bounds),
+                            multiplier * max(high for _, high in bounds)) if bounds else None)
+        return ranges[(parent_type, node)]
+
+    def _keeper(self, node, memo, ranges):
+        """Index of the child that is never removed (the one that can be pruned the most), None for leaves."""
+        children = node.selections or ()
+        if not children:
+            return None
+        minimums = [self._range(child, node.type, memo, ranges)[0] for child in children]
+        return minimums.index(min(minimums))
+
+    def _removal_path(self, operation, excess, memo, ranges):
+        """Return the path [(node, index of the child on the path), ...] to the field that should be removed.
+
+        Subtrees are only searched if the range of their savings (see savings) may contain a better candidate.
+        """
+        # the best candidates below and above the excess: [saving, path, (min or max) if the path ends in a subtree]
+        under = [0, None, None]
+        over  = [None, None, None]
+        # nodes to search along with the multiplier of costs of their children and the path from the root
+        stack = [(operation, 1, [])]
+        while stack and under[0] != excess:
+            node, scale, path = stack.pop()
+            keeper = self._keeper(node, memo, ranges)
+            for index, child in enumerate(node.selections or ()):
+                here = path + [(node, index)]
+                if index != keeper:
+                    cost = scale * self.estimate(child, node.type, memo)
+                    self._candidate(under, over, excess, (cost, cost), here)
+                bounds = self.savings(child, node.type, memo, ranges)
+                if bounds is not None and self._candidate(under, over, excess, [scale * b for b in bounds], here, True):
+                    stack.append((child, scale * self.multiplier(node.type, child), here))
+
+        saving, path, extreme = under if under[1] is not None else over
+        if path is None or extreme is None:
+            return path
+        return self._follow(path, extreme, memo, ranges)
+
+    @staticmethod
+    def _candidate(under, over, excess, bounds, path, subtree=False):
+        """Record the candidate removal(s) with the range of savings, return True if the range has to be searched."""
+        low, high = bounds
+        if high <= excess:
+            if high > under[0]:
+                under[:] = [high, path, max if subtree else None]
+            return False
+        if low >= excess:
+            if over[0] is None or low < over[0]:
+                over[:] = [low, path, min if subtree else None]
+            return False
+        return True
+
+    def _follow(self, path, extreme, memo, ranges):
+        """Extend the path into the subtree it ends in, down to the removal with the smallest / largest saving."""
+        parent, index = path[-1]
+        node = parent.selections[index]
+        while True:
+            children = node.selections or ()
+            keeper   = self._keeper(node, memo, ranges)
+            options  = [(extreme(bounds), True, index) for bounds, index in
+                        ((self.savings(child, node.type, memo, ranges), index) for index, child in enumerate(children))
+                        if bounds is not None]
+            options.extend((self.estimate(child, node.type, memo), False, index)
+                           for index, child in enumerate(children) if index != keeper)
+            _, deeper, index = extreme(options)
+            path.append((node, index))
+            if not deeper:
+                return path
+            node = children[index]
+
+    @staticmethod
+    def _remove(path, table):
+        """Rebuild the nodes on the path without the last one, return the new root."""
+        node, index = path[-1]
+        replacement = node.with_selections(table, node.selections[:index] + node.selections[index + 1:])
+        for parent, index in reversed(path[:-1]):
+            replacement = parent.with_selections(
+                table, parent.selections[:index] + (replacement,) + parent.selections[index + 1:])
+        return replacement
@@ -4,10 +4,7 @@ from builtins import object
 
 
 class GQLEnum(object):
-    name = ''
-    description = ''
-    is_deprecated = False
-    deprecation_reason = ''
+    __slots__ = ('name', 'description', 'is_deprecated', 'deprecation_reason')
 
     def __init__(self, name, description = '', is_deprecated=False, deprecation_reason=''):
         self.name = name
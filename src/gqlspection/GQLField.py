@@ -1,28 +1,21 @@
 # coding: utf-8
 from __future__ import unicode_literals
-from builtins import object
+from builtins import object, str
 import gqlspection
 
 # FIXME: Add support for InputFields
 
 
 class GQLField(object):
-    name = ''
-    description = ''
-    kind  = None
-    type  = None
-    args = None
-    is_deprecated = False
-    deprecation_reason = ''
-    schema = None
+    __slots__ = ('name', 'description', 'kind', 'type', 'args', 'is_deprecated', 'deprecation_reason', 'schema')
 
     def __init__(self, name, kind, schema, description='', args=None, is_deprecated=False, deprecation_reason=''):
         self.name = name
         self.kind = kind
-        self.type = gqlspection.GQLTypeProxy(kind.name, schema)
+        self.type = gqlspection.GQLTypeProxy.for_name(kind.name, schema)
         self.schema = schema
         self.description = description
-        self.args = args or gqlspection.GQLArgs(schema, {})
+        self.args = args or gqlspection.GQLArgs.EMPTY
         self.is_deprecated = is_deprecated
         self.deprecation_reason = deprecation_reason
 
@@ -37,10 +30,19 @@ class GQLField(object):
     def from_json(field, schema):
         return GQLField(
             name=field['name'],
-            kind=gqlspection.GQLTypeKind.from_json(field['type']),
+            kind=gqlspection.GQLTypeKind.from_json(field['type'], schema),
             schema=schema,
             description=field.get('description', ''),
             args=GQLField._wrap_args(field, schema),
             is_deprecated=field.get('isDeprecated', False),
             deprecation_reason=field.get('deprecationReason', '')
         )
+
+    # Prototype of the field, e.g.: "user(id: ID!, name: String): User"
+    def __repr__(self):
+        arguments = ', '.join([str(x) for x in self.args])
+        return '{name}{arguments}: {type}'.format(
+            name      = self.name,
+            arguments = "(%s)" % arguments if arguments else '',
+            type      = str(self.kind)
+        )
@@ -5,7 +5,7 @@ try:
     from collections.abc import Mapping
 except ImportError:
     from collections import Mapping  # type: ignore
-from collections import OrderedDict
+from bisect import bisect_left
 
 
 class GQLList(Mapping):
@@ -17,32 +17,42 @@ class GQLList(Mapping):
       - Upon iteration, will return original dictionaries, sorted by the 'name' field
       - Allows selecting elements both by index (gqllist[3]) and by the 'name' (gqllist['some-name'])
       - GQLList is meant for read-only data, so there is no way to add, update, delete elements
+
+    Elements are kept in a tuple (sorted by name) along with a parallel tuple of names and a name -> index map, so
+    positional access, lookups and membership checks (by name or by element) are O(1) and names can be searched by
+    prefix with bisect.
     """
-    _elements = None
+    __slots__ = ('_elements', '_names', '_index')
 
     def __init__(self, elements):
-        sorted_elements = sorted(elements, key=lambda i: i.name)
-        self._elements = OrderedDict(
-            ((i.name, i) for i in sorted_elements)
-        )
+        sorted_elements = []
+        for element in sorted(elements, key=lambda i: i.name):
+            if sorted_elements and sorted_elements[-1].name == element.name:
+                # the last element with the same name wins
+                sorted_elements[-1] = element
+            else:
+                sorted_elements.append(element)
+
+        self._elements = tuple(sorted_elements)
+        self._names    = tuple(i.name for i in sorted_elements)
+        self._index    = dict((name, position) for position, name in enumerate(self._names))
 
     def __getitem__(self, item):
         if isinstance(item, str):
+            return self._elements[self._index[item]]
+        if isinstance(item, int):
             return self._elements[item]
-        if type(item) == int:
-            key = list(self._elements.keys())[item]
-            return self._elements[key]
         raise Exception("GQLList: unknown type: %s", type(item))
 
     def __iter__(self):
-        return (self._elements[el] for el in self._elements)
+        return iter(self._elements)
 
     def __str__(self):
-        return '\n'.join((str(el) for el in self._elements))
+        return '\n'.join(self._names)
 
     def __repr__(self):
         first_line = "GQLList[{inner_type}]".format(
-            inner_type=str(type(self._elements[0]))
+            inner_type=str(type(self._elements[0])) if self._elements else ''
         )
 
         other_lines = ['    ' + repr(el) for el in self._elements]
@@ -50,13 +60,29 @@ class GQLList(Mapping):
         return '\n'.join([first_line] + other_lines)
 
     def __bool__(self):
-        return not not len(self._elements)
+        return not not self._elements
 
     def __len__(self):
         return len(self._elements)
 
     def __contains__(self, item):
         if isinstance(item, str):
-            return item in list(self._elements.keys())
-        else:
-            return item in list(self._elements.values())
+            return item in self._index
+
+        position = self._index.get(getattr(item, 'name', None))
+        return position is not None and self._elements[position] == item
+
+    def _prefixed_names(self, prefix):
+        start = end = bisect_left(self._names, prefix)
+        while end < len(self._names) and self._names[end].startswith(prefix):
+            end += 1
+        return slice(start, end)
+
+    def with_prefix(self, prefix):
+        """Return a tuple of elements whose names start with the prefix (e.g. for name completion)."""
+        return self._elements[self._prefixed_names(prefix)]
+
+    def _replace(self, element):
+        """Replace the element with the same name (for internal use only, e.g. when binding type references)."""
+        position = self._index[element.name]
+        self._elements = self._elements[:position] + (element,) + self._elements[position + 1:]
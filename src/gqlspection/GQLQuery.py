@@ -1,8 +1,9 @@
 # coding: utf-8
 from __future__ import unicode_literals
 from builtins import object
+from copy import copy
+from timeit import default_timer
 import gqlspection
-from gqlspection.utils import pad_string
 
 
 class GQLQuery(object):
@@ -11,12 +12,31 @@ class GQLQuery(object):
     name   = ''
     description = ''
     fields = None
+    max_depth = 5
+    max_reentries = None
+    node_budget = None
+    fragments = False
+    cost_model = None
+    cost_budget = None
+    # fixed selection tree of the operation (parts of a split operation)
+    _selection = None
 
-    def __init__(self, gqltype, operation='query', name='', fields=None):
-        self.fields = fields if fields else self.type.fields
+    def __init__(self, gqltype, operation='query', name='', fields=None, max_depth=5, max_reentries=None,
+                 node_budget=None, fragments=False, cost_model=None, cost_budget=None):
+        self.fields = fields if fields else gqltype.fields
         self.operation = operation
         self.name = name
         self.type = gqltype
+        self.max_depth = max_depth
+        # path-aware cycle detection & per-operation node budget (see GQLExpansion)
+        self.max_reentries = max_reentries
+        self.node_budget = node_budget
+        # nested selections are defined once as named fragments, either True (the operation is followed by definitions
+        # of its fragments) or GQLFragments shared by all operations of a document (which defines all of them at once)
+        self.fragments = fragments
+        # the most expensive branches get pruned until the estimated cost fits the budget (see GQLCost)
+        self.cost_model = cost_model or gqlspection.GQLCost()
+        self.cost_budget = cost_budget
 
     def __repr__(self):
         self.str()
@@ -24,20 +44,6 @@ class GQLQuery(object):
     def __str__(self):
         self.str()
 
-    @staticmethod
-    def _indent(indent):
-        """Generates characters that should be used for Space and Newline, depending on request indentation level.
-
-        If indent > 0, space is preserved and new lines are started with 'indent' number of spaces.
-        If indent = 0, space is preserved, but new lines are removed
-        If indent = None, both space and newlines are trimmed.
-        """
-        NEWLINE = '\n' if indent else ''
-        PADDING = ' ' * (indent) if indent else ''
-        SPACE   = ' '  if (indent is not None) else ''
-
-        return SPACE, NEWLINE, PADDING
-
     def str(self, pad=4):
         """Generate a string representation.
 
@@ -45,30 +51,122 @@ class GQLQuery(object):
         'indent=0'    generates minimized query (oneliner without comments).
         'indent=None' generates super-optimized query where spaces are omitted as much as possible
         """
-        # whitespace characters collapse when query gets minimized
-        SPACE, NEWLINE, PADDING = self._indent(pad)
+        return ''.join(self.iter_lines(pad))
+
+    def iter_lines(self, pad=4):
+        """Lazily generate the string representation line by line (see str() for the meaning of 'pad').
+
+        Nothing gets accumulated in memory, so arbitrarily large queries can be streamed to stdout or a file.
+        """
+        return self._iter_lines(gqlspection.GQLWriter(pad))
 
-        first_line = ''.join((
-            self.operation,
-            (' ' + self.name) if self.name else '',
-            SPACE + '{' + NEWLINE
-        ))
+    def write(self, writer):
+        """Write the query to a GQLWriter (which in turn writes either to a buffer or to a file-like sink)."""
+        writer.writelines(self._iter_lines(writer))
 
-        middle_lines = ""
+    def _iter_lines(self, writer):
+        stats = self.type.schema.stats
+        if stats is None:
+            return self._render_lines(writer, self.selection())
+        return self._measured_lines(writer, stats)
+
+    def selection(self):
+        """Build the selection tree of the operation (GQLSelection named after the operation, e.g. 'query Name').
+
+        Structurally identical subtrees are shared (see GQLSelection), so the tree takes far less memory than its text.
+        """
+        if self._selection is not None:
+            return self._selection
+
+        # limits are shared by all fields, so that node budget applies to the operation as a whole
+        expansion = gqlspection.GQLExpansion(self.max_reentries, self.node_budget)
+        expansion.enter(self.type)
+        selections = []
         for field in self.fields:
-            subquery = gqlspection.GQLSubQuery(field)
-            middle_lines += NEWLINE.join(subquery.str(pad).splitlines()) + NEWLINE
-        middle_lines = pad_string(middle_lines, pad)
-
-        last_line = '}' if not self.type.kind.is_final else ""
-
-        if pad:
-            if self.description:
-                description_line = gqlspection.utils.format_comment(self.description) + NEWLINE
-            else:
-                description_line = ''
-            result = description_line + first_line + middle_lines + last_line
-        else:
-            result = first_line + middle_lines + last_line
-
-        return result
+            # fields that don't fit the budget are left out, but an operation selects at least one field
+            if selections and not expansion.fits(not field.type.kind.is_final and self.max_depth > 1):
+                continue
+            selections.append(gqlspection.GQLSubQuery(field, max_depth=self.max_depth).selection(expansion))
+        selections = tuple(selections)
+        table = self.type.schema._selections
+        operation = gqlspection.GQLSelection.intern(
+            table,
+            self.operation + ((' ' + self.name) if self.name else ''),
+            (),
+            self.type.name,
+            selections
+        )
+        if self.cost_budget is not None:
+            operation = self.cost_model.prune(operation, self.cost_budget, table)
+        return operation
+
+    def split(self, max_bytes=None, max_fields=None, pad=4):
+        """Split the operation into as few operations as possible, each of them fitting the limits (see GQLSplitter).
+
+        'max_bytes' applies to the output of str(pad), 'max_fields' limits the number of selected fields. Every part
+        keeps the path from the root to the fields it selects. Parts are rendered inline, without fragments.
+        """
+        splitter  = gqlspection.GQLSplitter(max_bytes, max_fields, pad)
+        writer    = gqlspection.GQLWriter(pad)
+        operation = self.selection()
+        # everything but the selection set: comments with description, the header and the closing brace
+        overhead  = len(''.join(self._render_lines(writer, operation.with_selections({}, ()))).encode('utf-8'))
+
+        parts = []
+        for group in splitter.split(operation.selections, self.type.schema._selections, overhead):
+            part = copy(self)
+            part.fragments  = False
+            part._selection = operation.with_selections(self.type.schema._selections, group)
+            parts.append(part)
+        return parts
+
+    def cost(self):
+        """Estimated cost of the operation for the server (see GQLCost)."""
+        return self.cost_model.total(self.selection())
+
+    def minimized(self):
+        """Shortest valid form of the operation (see GQLSelection.minimized), fragments are not used."""
+        return self.selection().minimized()
+
+    def json(self):
+        """JSON compatible structure of the selection tree (see GQLSelection.json)."""
+        return self.selection().json()
+
+    def _measured_lines(self, writer, stats):
+        """Same as _render_lines(), additionally recording rendering time (time spent by the consumer of the lines is
+        excluded), number of rendered nodes and output bytes.
+        """
+        elapsed, size = 0.0, 0
+        started = default_timer()
+        operation = self.selection()
+        for line in self._render_lines(writer, operation):
+            elapsed += default_timer() - started
+            yield line
+            size += len(line.encode('utf-8'))
+            started = default_timer()
+        elapsed += default_timer() - started
+
+        stats.add_time('render', elapsed)
+        stats.count('operations')
+        stats.count('rendered nodes', operation.size - 1)
+        stats.count('estimated cost', self.cost_model.total(operation))
+        stats.count('output bytes', size)
+
+    def _render_lines(self, writer, operation):
+        if writer.pad and self.description:
+            for line in gqlspection.utils.format_comment(self.description).splitlines():
+                yield writer.format(line)
+
+        yield writer.format(operation.header(writer.SPACE))
+
+        # a shared GQLFragments only collects the spreads, its definitions are written at the end of the document
+        fragments = gqlspection.GQLFragments() if self.fragments is True else (self.fragments or None)
+        for line in gqlspection.GQLSelection.iter_nodes_lines(writer, operation.selections, 1, fragments):
+            yield line
+
+        if not self.type.kind.is_final:
+            yield '}'
+
+        if self.fragments is True:
+            for line in fragments.iter_lines(writer):
+                yield line
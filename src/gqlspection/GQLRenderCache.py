@@ -0,0 +1,85 @@
+# coding: utf-8
+from __future__ import unicode_literals
+from builtins import object
+from collections import OrderedDict
+
+
+class GQLRenderCache(object):
+    """Bounded LRU cache for built selection sets.
+
+    Popular types (User, Node, PageInfo, ...) are reachable from almost every root field, so the same selection gets
+    built over and over again. The cache is keyed by (type name, remaining depth), as those are the only things the
+    selection set of a type depends on (unless path dependent limits are used, see GQLExpansion).
+
+    Characteristics:
+
+      - Holds at most 'max_size' entries, the least recently used entry gets evicted first
+      - Counts hits, misses and evictions, so that efficiency can be checked on real schemas
+      - 'max_size=0' disables caching altogether (every lookup is a miss)
+    """
+    max_size  = 4096
+    hits      = 0
+    misses    = 0
+    evictions = 0
+    _entries  = None
+
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self.clear()
+
+    def clear(self):
+        self._entries  = OrderedDict()
+        self.hits      = 0
+        self.misses    = 0
+        self.evictions = 0
+
+    def get(self, key, render):
+        """Return the cached value for 'key', calling render() to produce it on a miss."""
+        value = self.find(key)
+        if value is None:
+            value = self.store(key, render())
+        return value
+
+    def find(self, key):
+        """Return the cached value for 'key' (None on a miss)."""
+        try:
+            # pop & reinsert moves the key to the end (OrderedDict.move_to_end is not available in Python 2)
+            value = self._entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries[key] = value
+        return value
+
+    def store(self, key, value):
+        """Cache the value produced after a miss, evicting the least recently used entries if needed."""
+        if not self.max_size:
+            return value
+
+        self._entries[key] = value
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return value
+
+    @property
+    def stats(self):
+        return {
+            'size':      len(self._entries),
+            'max_size':  self.max_size,
+            'hits':      self.hits,
+            'misses':    self.misses,
+            'evictions': self.evictions
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __repr__(self):
+        return 'GQLRenderCache(size={size}, max_size={max_size}, hits={hits}, misses={misses}, ' \
+               'evictions={evictions})'.format(**self.stats)
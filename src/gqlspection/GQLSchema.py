@@ -1,6 +1,8 @@
 # coding: utf-8
 from __future__ import unicode_literals
-from builtins import object, str
+from builtins import bytes, object, str
+from contextlib import closing
+from weakref import WeakValueDictionary
 from gqlspection import log
 import gqlspection
 
@@ -9,38 +11,205 @@ class GQLSchema(object):
     types          = None
     query          = None
     mutation       = None
+    render_cache   = None
+    transport      = None
+    introspection  = None
+    stats          = None
+    # intern tables for GQLTypeKind, GQLTypeProxy and GQLSelection objects
+    _kinds         = None
+    _proxies       = None
+    _selections    = None
 
-    def __init__(self, url=None, extra_headers=None, json=None, logger=None):
+    def __init__(self, url=None, extra_headers=None, json=None, logger=None, render_cache_size=4096, lazy=False,
+                 stream=None, cache=None, transport=None, introspection=None, stats=None):
+        """Load the schema from an introspection result ('json', dict or string), a file-like object containing the
+        introspection result ('stream', read incrementally one type at a time) or from the endpoint ('url').
+
+        With 'lazy=True' types are only built when they are first reached (through query, mutation or field traversal),
+        which is much faster when only a few operations are needed from a huge schema. References to undefined types
+        are then reported when reached, instead of at load time.
+
+        'cache' enables the on-disk cache of parsed schemas for 'json' and 'stream' sources, either True (default
+        location) or a GQLSchemaCache object. Cached schemas are always complete, so 'lazy' is ignored when the cache is
+        used.
+
+        Introspection results are fetched from 'url' through 'transport' (GQLTransport.shared() by default) and parsed
+        while they're being received. 'introspection' is a dict of get_introspection_query() arguments (e.g.
+        {'descriptions': False} to roughly halve the response size). If type references turn out to be nested deeper
+        than the query could describe, the request is repeated with a deeper TypeRef fragment, unless 'adaptive' is set
+        to False in the same dict (with 'lazy=True' truncated references are only detected when types are reached).
+        Set 'chunk_size' (and optionally 'parallel') to introspect in chunks, see send_chunked_request().
+
+        'stats' enables timing of loading and rendering phases along with object counters, either a GQLStats object or
+        a 'callback(phase, seconds, stats)' function called whenever a phase finishes. Stats of operations generated
+        from the schema are recorded as well. The active collector (see GQLStats) is used by default.
+        """
         if logger:
             log.logger = logger
 
+        # selection sets of types are shared between all queries & mutations generated from this schema
+        self.render_cache  = gqlspection.GQLRenderCache(max_size=render_cache_size)
+        self.transport     = transport or gqlspection.GQLTransport.shared()
+        self.introspection = introspection or {}
+        # identical type references share a single GQLTypeKind / GQLTypeProxy
+        self._kinds   = {}
+        self._proxies = {}
+        # structurally identical subtrees of generated operations share a single GQLSelection, as long as it's in use
+        self._selections = WeakValueDictionary()
+        if stats is not None and not isinstance(stats, gqlspection.GQLStats):
+            stats = gqlspection.GQLStats(callback=stats)
+        self.stats = stats or gqlspection.GQLStats.active()
+
+        with gqlspection.GQLStats.activate(self.stats), gqlspection.GQLStats.phase('schema'):
+            self._open(url, extra_headers, json, stream, cache, lazy)
+        if self.stats:
+            self._record_objects()
+
+    def _open(self, url, extra_headers, json, stream, cache, lazy):
+        """Load the schema from the cache (if enabled) or from the source."""
+        if cache:
+            cache = cache if isinstance(cache, gqlspection.GQLSchemaCache) else gqlspection.GQLSchemaCache()
+            key = cache.key(stream if stream is not None else json)
+            if key:
+                if cache.load(key, self):
+                    gqlspection.GQLStats.record('cache hits')
+                    return
+                # storing needs all types materialised, which would defeat lazy loading
+                if not lazy:
+                    self._load(url, extra_headers, json, stream, lazy=False)
+                    self._store(cache, key)
+                    return
+
+        self._load(url, extra_headers, json, stream, lazy)
+
+    def _store(self, cache, key):
+        """Store the schema in the cache, failing to write the cache doesn't fail the load."""
+        try:
+            cache.store(key, self)
+        except (OSError, IOError) as e:
+            log.warn("Couldn't store the schema in the cache (%s): %s", cache.directory, e)
+
+    def _record_objects(self):
+        # lazily loaded types would get materialised by counting their fields
+        if not isinstance(self.types, gqlspection.GQLLazyTypes):
+            self.stats.count('fields', sum(len(gqltype.fields) for gqltype in self.types))
+        self.stats.count('type references', len(self._proxies))
+        self.stats.count('type kinds', len(self._kinds))
+
+    def _load(self, url, extra_headers, json, stream, lazy):
+        """Build the schema out of the introspection result."""
+        if stream is None and not json and url:
+            return self._fetch(url, extra_headers, lazy)
+
+        if stream is not None:
+            # types are consumed right from the stream, the rest of the schema is available after that
+            original_schema = gqlspection.GQLSchemaStream(stream)
+        else:
+            original_schema = self._get_original_schema(json)
+
+        if lazy:
+            self.types = gqlspection.GQLLazyTypes(self, original_schema)
+        else:
+            self.types = gqlspection.GQLTypes(self, original_schema)
+
+        if stream is not None:
+            original_schema = original_schema.schema
+
+        self.query    = self._extract_query_type(original_schema)
+        self.mutation = self._extract_mutation_type(original_schema)
+
+        # lazily loaded types keep using proxies, as linking would need to materialise all of them
+        if not lazy:
+            self._link()
+
+    def _fetch(self, url, extra_headers, lazy):
+        """Load the schema from the endpoint, retry with a deeper TypeRef fragment if type references got truncated."""
+        from gqlspection.introspection_query import DEFAULT_DEPTH, get_introspection_query, next_depth
+
+        options = dict(self.introspection)
+        if options.get('chunk_size'):
+            result = self.send_request(url, extra_headers, transport=self.transport, **options)
+            return self._load(None, None, result, None, lazy)
+        options.pop('chunk_size', None)
+        options.pop('parallel', None)
+
+        adaptive = options.pop('adaptive', True)
+        while True:
+            try:
+                with closing(self.transport.open(url, get_introspection_query(**options), extra_headers)) as response:
+                    reader = gqlspection.GQLResponseReader(response)
+                    self._load(None, None, None, reader, lazy)
+                    gqlspection.GQLStats.record('response bytes', reader.size)
+                    return
+            except gqlspection.GQLTypeRefTruncated as e:
+                depth = next_depth(options.get('depth', DEFAULT_DEPTH))
+                if not adaptive or not depth:
+                    raise
+                log.warn("%s Retrying with depth %d.", e, depth)
+                options['depth'] = depth
+                self._kinds   = {}
+                self._proxies = {}
+
+    def _get_original_schema(self, json):
+        """Get the '__schema' part of the introspection result from the provided JSON."""
         if json:
-            if isinstance(json, str):
+            if isinstance(json, (str, bytes)):
                 json = self._str_to_json(json)
 
             if 'data' in json and '__schema' in json['data']:
-                original_schema = json['data']['__schema']
+                return json['data']['__schema']
             elif '__schema' in json:
-                original_schema = json['__schema']
+                return json['__schema']
             elif 'types' in json:
-                original_schema = json
+                return json
             else:
                 raise Exception("GQLSchema: Couldn't parse JSON schema.")
-        elif url:
-            introspection_result = self.send_request(url, extra_headers)
-            original_schema = introspection_result['data']['__schema']
         else:
             raise Exception("GQLSchema: Provide either JSON or URL.")
 
-        self.types = gqlspection.GQLTypes(self, original_schema)
-
-        self.query    = self._extract_query_type(original_schema)
-        self.mutation = self._extract_mutation_type(original_schema)
-
     @staticmethod
     def _str_to_json(data):
+        from gqlspection import json_backend
+        return json_backend.loads(data)
+
+    @staticmethod
+    def extract_root_types(data):
+        """Find query & mutation type definitions in the raw introspection JSON string without decoding all of it.
+
+        Returns a minimal schema with just these (one or two) types, which is enough for listing available operations
+        with a lazily loaded schema. If definitions can't be located reliably, returns None and the caller should fall
+        back to decoding the whole document.
+        """
         import json
-        return json.loads(data)
+        import re
+
+        roots = {}
+        for root in ('queryType', 'mutationType'):
+            match = re.search(r'"%s"\s*:\s*(null|\{[^{}]*\})' % root, data)
+            roots[root] = json.loads(match.group(1)) if match else None
+
+        if not roots['queryType']:
+            return None
+
+        decoder = json.JSONDecoder()
+        types = []
+        for root in roots.values():
+            if not root:
+                continue
+            # type definitions start with a few scalar keys, the closest opening brace before the name is the beginning
+            # of the object (type references with the same name are skipped, as they don't have 'fields')
+            for match in re.finditer(r'"name"\s*:\s*%s' % re.escape(json.dumps(root['name'])), data):
+                try:
+                    candidate = decoder.raw_decode(data, data.rfind('{', 0, match.start()))[0]
+                except ValueError:
+                    continue
+                if isinstance(candidate, dict) and candidate.get('name') == root['name'] and 'fields' in candidate:
+                    types.append(candidate)
+                    break
+            else:
+                return None
+
+        return {'queryType': roots['queryType'], 'mutationType': roots['mutationType'], 'types': types}
 
     def _extract_query_type(self, schema):
         """Get the query type name (typically 'Query').
@@ -57,7 +226,7 @@ class GQLSchema(object):
         if 'queryType' in schema:
             name = schema['queryType'].get('name', False)
             if name:
-                return gqlspection.GQLTypeProxy(name, self)
+                return gqlspection.GQLTypeProxy.for_name(name, self)
             else:
                 raise Exception("GQLSchema: Invalid schema - queryType is null. File a bug if this happens in real "
                                 "world.")
@@ -74,40 +243,196 @@ class GQLSchema(object):
                 }
             }
         """
-        if 'mutationType' in schema:
-            name = schema['mutationType'].get('name', None)
-            if name:
-                return gqlspection.GQLTypeProxy(name, self)
-            else:
-                raise None
+        # 'mutationType' is null (rather than missing) in introspection results of servers without mutations
+        name = (schema.get('mutationType') or {}).get('name', None)
+        if name:
+            return gqlspection.GQLTypeProxy.for_name(name, self)
         else:
             return None
 
+    def _link(self):
+        """Bind all type references (GQLTypeProxy objects) directly to the GQLType they point to.
+
+        This is done once, after all types have been loaded, so that rendering can use plain attribute access instead
+        of going through proxies. All references to undefined types get reported at once.
+        """
+        with gqlspection.GQLStats.phase('link'):
+            self._link_all()
+
+    def _link_all(self):
+        dangling = []
+
+        def resolve(reference, location):
+            if not isinstance(reference, gqlspection.GQLTypeProxy):
+                return reference
+            if reference._upstream is not None:
+                # proxies are interned, so most of them have been resolved already
+                return reference._upstream
+            try:
+                reference._upstream = self.types[reference.name]
+            except KeyError:
+                dangling.append("{location}: {name}".format(location=location, name=reference.name))
+                return reference
+            return reference._upstream
+
+        for gqltype in self.types:
+            self._link_type(gqltype, resolve)
+
+        self.query = resolve(self.query, 'queryType')
+        if self.mutation:
+            self.mutation = resolve(self.mutation, 'mutationType')
+
+        if dangling:
+            raise Exception("GQLSchema: Invalid schema - references to undefined types: %s" % ', '.join(dangling))
+
     @staticmethod
-    def send_request(url, extra_headers=None, minimize=True):
-        import requests
-        from gqlspection.introspection_query import get_introspection_query
+    def _link_type(gqltype, resolve):
+        """Bind type references within fields, arguments, input fields and interfaces of a single type."""
+        for field in gqltype.fields:
+            location = '.'.join((gqltype.name, field.name))
+            field.type = resolve(field.type, location)
+            for arg in field.args:
+                arg.type = resolve(arg.type, "{location}({arg})".format(location=location, arg=arg.name))
 
-        headers = {'Content-Type': 'application/json'}
-        if extra_headers:
-            headers.update(extra_headers)
+        for arg in gqltype.args:
+            arg.type = resolve(arg.type, '.'.join((gqltype.name, arg.name)))
 
-        result = requests.post(url, json={'query': get_introspection_query(minimize=minimize)}, headers=headers).json()
+        for interface in gqltype.interfaces:
+            gqltype.interfaces._replace(resolve(interface, "{name} implements".format(name=gqltype.name)))
+
+    @staticmethod
+    def from_urls_async(urls, concurrency=10, per_host=2, extra_headers=None, transport=None, **kwargs):
+        """Introspect many endpoints concurrently (Python 3.7+), returns a coroutine:
+
+            schemas = await GQLSchema.from_urls_async(urls, concurrency=50)
+
+        The result is a dict of 'url: GQLSchema' (or the Exception raised while loading it). Use
+        gqlspection.aio.iter_schemas() to process schemas in the order responses arrive.
+        """
+        from gqlspection.aio import load_schemas
+        return load_schemas(urls, concurrency, per_host, extra_headers, transport, **kwargs)
+
+    @staticmethod
+    def _post(url, query, extra_headers, transport):
+        result = transport.post(url, query, extra_headers)
         if 'errors' in result:
             raise Exception([error['message'] for error in result['errors']])
-
         return result
 
-    def generate_query(self, name):
+    @staticmethod
+    def send_request(url, extra_headers=None, minimize=True, transport=None, chunk_size=None, parallel=4, **options):
+        """Send the introspection query and return the decoded result.
+
+        Keyword arguments are passed to get_introspection_query(), see GQLSchema() for the 'adaptive' option. With
+        'chunk_size' set, the schema is introspected in chunks (see send_chunked_request).
+        """
+        transport = transport or gqlspection.GQLTransport.shared()
+        adaptive = options.pop('adaptive', True)
+        with gqlspection.GQLStats.phase('introspection'):
+            return GQLSchema._send_adaptive(url, extra_headers, minimize, transport, chunk_size, parallel, adaptive,
+                                            options)
+
+    @staticmethod
+    def _send_adaptive(url, extra_headers, minimize, transport, chunk_size, parallel, adaptive, options):
+        from gqlspection.introspection_query import DEFAULT_DEPTH, get_introspection_query, has_truncated_type_refs, \
+            next_depth
+
+        while True:
+            if chunk_size:
+                result = GQLSchema.send_chunked_request(url, extra_headers, minimize, transport, chunk_size, parallel,
+                                                        **options)
+            else:
+                result = GQLSchema._post(url, get_introspection_query(minimize=minimize, **options), extra_headers,
+                                         transport)
+
+            depth = next_depth(options.get('depth', DEFAULT_DEPTH))
+            if not (adaptive and depth and has_truncated_type_refs(result)):
+                return result
+            log.warn("Type references are truncated, retrying with depth %d.", depth)
+            options['depth'] = depth
+
+    @staticmethod
+    def send_chunked_request(url, extra_headers=None, minimize=True, transport=None, chunk_size=100, parallel=4,
+                             **options):
+        """Introspect the schema in chunks, for servers that time out or cap the size of responses.
+
+        Only names and kinds of types are requested first, then full definitions are requested 'chunk_size' types at a
+        time (aliased __type(name: ...) calls), with up to 'parallel' requests in flight. The result has the same
+        structure as the response to the regular introspection query.
+        """
+        from gqlspection.introspection_query import get_introspection_query, get_types_query
+        from gqlspection.utils import parallel_map
+
+        transport = transport or gqlspection.GQLTransport.shared()
+        query = get_introspection_query(minimize=minimize, full=False, **options)
+        schema = GQLSchema._post(url, query, extra_headers, transport)['data']['__schema']
+
+        # introspection types are skipped by GQLSchema anyway
+        names = [t['name'] for t in schema['types'] if not t['name'].startswith('__')]
+        chunks = [names[i:i + chunk_size] for i in range(0, len(names), chunk_size)]
+
+        # requests are sent from worker threads, report them to the collector of this one
+        stats = gqlspection.GQLStats.active()
+
+        def fetch(chunk):
+            with gqlspection.GQLStats.activate(stats):
+                data = GQLSchema._post(url, get_types_query(chunk, minimize=minimize, **options), extra_headers,
+                                       transport)['data']
+            return [data['t%d' % i] for i in range(len(chunk)) if data.get('t%d' % i)]
+
+        log.info("Introspecting %d types in %d chunks.", len(names), len(chunks))
+        schema['types'] = [t for types in parallel_map(fetch, chunks, parallel) for t in types]
+        return {'data': {'__schema': schema}}
+
+    def generate_query(self, name, max_depth=5, max_reentries=None, node_budget=None, fragments=False,
+                       cost_model=None, cost_budget=None):
+        """Generate a query for the root field (either GQLField or its name).
+
+        'max_reentries' limits how many times a type may be re-entered on the current path (0 means that cycles are never
+        followed), 'node_budget' limits the total number of selected fields. Both are unlimited by default. Re-entry
+        limits alone still let operations grow exponentially with the depth on schemas where many types reference each
+        other, so combine them with a node budget there.
+
+        With 'fragments' set, every nested selection of a type is defined once as a named fragment and referenced with
+        '...TypeFields' (see GQLQuery), so the size of the output depends on the number of distinct types reached.
+
+        With 'cost_budget' set, the most expensive branches are pruned until the cost estimated by 'cost_model' (GQLCost
+        with default list multipliers and weights if not provided) fits the budget.
+        """
         if isinstance(name, str):
             field = self.query.fields[name]
         else:
             field = name
-        return gqlspection.GQLQuery(self.query, 'query', fields=[field])
+        return gqlspection.GQLQuery(self.query, 'query', fields=[field], max_depth=max_depth,
+                                    max_reentries=max_reentries, node_budget=node_budget, fragments=fragments,
+                                    cost_model=cost_model, cost_budget=cost_budget)
 
-    def generate_mutation(self, name):
+    def generate_mutation(self, name, max_depth=5, max_reentries=None, node_budget=None, fragments=False,
+                          cost_model=None, cost_budget=None):
+        """Generate a mutation for the root field (either GQLField or its name), see generate_query() for limits."""
         if isinstance(name, str):
-            field = self.query.fields[name]
+            field = self.mutation.fields[name]
         else:
             field = name
-        return gqlspection.GQLQuery(self.mutation, 'mutation', fields=[field])
+        return gqlspection.GQLQuery(self.mutation, 'mutation', fields=[field], max_depth=max_depth,
+                                    max_reentries=max_reentries, node_budget=node_budget, fragments=fragments,
+                                    cost_model=cost_model, cost_budget=cost_budget)
+
+    def iter_operations(self, queries=True, mutations=True, **limits):
+        """Lazily generate a GQLQuery per root field.
+
+        'queries' and 'mutations' are either booleans (generate all of them / none of them) or iterables of field names.
+        Operations are created one at a time, so combined with GQLQuery.iter_lines() the output can be streamed without
+        holding whole documents in memory. Keyword arguments (max_depth, max_reentries, node_budget, fragments,
+        cost_model, cost_budget) are passed through to generate_query() / generate_mutation(), pass a shared
+        GQLFragments as 'fragments' to define every fragment once in a document made of all operations.
+        """
+        if queries:
+            fields = self.query.fields if queries is True else (self.query.fields[name] for name in queries)
+            for field in fields:
+                yield self.generate_query(field, **limits)
+
+        if mutations and self.mutation:
+            fields = self.mutation.fields if mutations is True else (self.mutation.fields[name] for name in mutations)
+            for field in fields:
+                yield self.generate_mutation(field, **limits)
@@ -0,0 +1,216 @@
+# coding: utf-8
+from __future__ import unicode_literals
+from builtins import bytes, object, str
+import hashlib
+import os
+import tempfile
+import gqlspection
+from gqlspection import json_backend, log
+
+
+def _library_version():
+    try:
+        from importlib.metadata import version
+        return version('gqlspection')
+    except Exception:
+        pass
+    try:
+        import pkg_resources
+        return pkg_resources.get_distribution('gqlspection').version
+    except Exception:
+        return 'unknown'
+
+
+def _default_directory():
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'gqlspection')
+
+
+class GQLSchemaCache(object):
+    """On-disk cache of parsed schemas, keyed by SHA-256 of the introspection result (plus the library version).
+
+    The parsed and resolved object model is stored in a compact form: flat tuples of names, descriptions and indexes
+    into a table of type references, stored as JSON (plain data only, so a tampered entry can't run any code). Loading
+    it is much cheaper than decoding the introspection result and looking up its dictionaries, and objects get linked
+    exactly the same way as when parsing JSON. Unreadable or malformed entries are dropped and count as a miss.
+
+    Once the total size of the cache directory exceeds 'max_size' bytes, least recently used entries are evicted.
+    """
+    # bump whenever the format of stored data changes
+    FORMAT = 2
+    SUFFIX = '.schema'
+
+    directory = None
+    max_size = 256 * 1024 * 1024
+    version = None
+
+    def __init__(self, directory=None, max_size=256 * 1024 * 1024):
+        self.directory = directory or _default_directory()
+        self.max_size = max_size
+        self.version = "{library}/{format}".format(library=_library_version(), format=self.FORMAT)
+
+    def key(self, source):
+        """Calculate the cache key of an introspection result (string, bytes or seekable file-like object).
+
+        Returns None for sources that can't be hashed (e.g. already decoded JSON).
+        """
+        digest = hashlib.sha256(self.version.encode('utf-8'))
+
+        if isinstance(source, str):
+            digest.update(source.encode('utf-8'))
+        elif isinstance(source, bytes):
+            digest.update(source)
+        elif hasattr(source, 'read') and hasattr(source, 'seek'):
+            position = source.tell()
+            for chunk in iter(lambda: source.read(1024 * 1024), source.read(0)):
+                digest.update(chunk if isinstance(chunk, bytes) else chunk.encode('utf-8'))
+            source.seek(position)
+        else:
+            return None
+
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def load(self, key, schema):
+        """Restore the cached schema into the provided (empty) GQLSchema object, return False on cache miss."""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, 'rb') as f:
+                state = json_backend.load(f)
+            self._restore(schema, state)
+            # mark as recently used
+            os.utime(path, None)
+        except Exception as e:
+            log.warn("Dropping unusable schema cache entry %s: %s", path, e)
+            self._remove(path)
+            self._reset(schema)
+            return False
+
+        log.info("Loaded schema from cache: %s", path)
+        return True
+
+    def store(self, key, schema):
+        """Store the parsed schema, then evict old entries if the cache got too big."""
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+        fd, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(json_backend.dumps(self._dump(schema)).encode('utf-8'))
+            if os.path.exists(self._path(key)):
+                os.remove(self._path(key))
+            os.rename(temporary, self._path(key))
+        except Exception:
+            self._remove(temporary)
+            raise
+
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the total size fits within 'max_size'."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(self.SUFFIX):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size, os.path.join(self.directory, name)))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith(self.SUFFIX):
+                    self._remove(os.path.join(self.directory, name))
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _reset(schema):
+        """Drop whatever a failed restore left in the schema, so that it can be loaded from the source instead."""
+        schema._kinds   = {}
+        schema._proxies = {}
+        schema.types    = None
+        schema.query    = None
+        schema.mutation = None
+
+    @staticmethod
+    def _dump(schema):
+        """Convert schema to a compact tuple-based representation."""
+        kinds = {}
+
+        def kind_index(kind):
+            key = (kind.name, kind.kind, kind.modifiers)
+            if key not in kinds:
+                kinds[key] = len(kinds)
+            return kinds[key]
+
+        def args(elements):
+            return tuple((a.name, kind_index(a.kind), a.description, a.default_value) for a in elements)
+
+        types = tuple(
+            (
+                t.name, kind_index(t.kind), t.description, t.url,
+                tuple(
+                    (f.name, kind_index(f.kind), f.description, args(f.args), f.is_deprecated, f.deprecation_reason)
+                    for f in t.fields
+                ),
+                tuple(i.name for i in t.interfaces),
+                tuple((e.name, e.description, e.is_deprecated, e.deprecation_reason) for e in t.enums),
+                args(t.args)
+            ) for t in schema.types
+        )
+
+        kinds = tuple(key for key, _ in sorted(kinds.items(), key=lambda item: item[1]))
+        return kinds, types, schema.query.name, schema.mutation.name if schema.mutation else None
+
+    @staticmethod
+    def _restore(schema, state):
+        """Build the object model out of the compact representation and link it."""
+        kinds, types, query, mutation = state
+
+        kinds = [gqlspection.GQLTypeKind(name, kind, modifiers) for name, kind, modifiers in kinds]
+        schema._kinds = dict(((k.name, k.kind, k.modifiers), k) for k in kinds)
+        proxy = gqlspection.GQLTypeProxy.for_name
+
+        def args(elements):
+            return [
+                gqlspection.GQLArg(name, kinds[kind], proxy(kinds[kind].name, schema), description, default_value)
+                for name, kind, description, default_value in elements
+            ]
+
+        elements = []
+        for name, kind, description, url, fields, interfaces, enums, type_args in types:
+            elements.append(gqlspection.GQLType(
+                name=name,
+                kind=kinds[kind],
+                schema=schema,
+                description=description,
+                fields=gqlspection.GQLFields.from_elements([
+                    gqlspection.GQLField(f_name, kinds[f_kind], schema, f_description, args(f_args), deprecated, reason)
+                    for f_name, f_kind, f_description, f_args, deprecated, reason in fields
+                ]),
+                interfaces=gqlspection.GQLInterfaces.from_elements([proxy(i, schema) for i in interfaces]),
+                enums=gqlspection.GQLEnums.from_elements([gqlspection.GQLEnum(*enum) for enum in enums]),
+                args=gqlspection.GQLArgs.from_elements(args(type_args)),
+                url=url
+            ))
+
+        schema.types = gqlspection.GQLTypes.from_elements(elements)
+        schema.query = proxy(query, schema)
+        schema.mutation = proxy(mutation, schema) if mutation else None
+        schema._link()
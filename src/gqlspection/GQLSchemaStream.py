@@ -0,0 +1,148 @@
+# coding: utf-8
+from __future__ import unicode_literals
+from builtins import object, str
+import codecs
+import json
+import re
+
+
+class GQLSchemaStream(object):
+    """Incremental reader of introspection results, yields type definitions one at a time.
+
+    Reads a file-like object (text or binary, UTF-8 is assumed for the latter) in chunks and walks down to the list
+    of types, which can be located in any of the places accepted by GQLSchema:
+
+        {"data": {"__schema": {"types": [...]}}}
+        {"__schema": {"types": [...]}}
+        {"types": [...]}
+
+    Every element of the 'types' list is decoded separately and yielded by iter_types(), so the whole document is never
+    held in memory. Other keys found next to 'types' (queryType, mutationType, ...) are decoded as usual and become
+    available through the 'schema' attribute once iteration is over.
+    """
+    chunk_size = 64 * 1024
+
+    # keys that lead to the 'types' list and the list itself
+    ROUTES     = (('data',), ('data', '__schema'), ('__schema',))
+    TYPE_LISTS = (('types',), ('data', '__schema', 'types'), ('__schema', 'types'))
+
+    WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+    stream  = None
+    schema  = None
+    _levels = None
+
+    def __init__(self, stream, chunk_size=64 * 1024):
+        self.stream     = stream
+        self.chunk_size = chunk_size
+        self.schema     = None
+
+        self._levels  = {}
+        self._buf     = ''
+        self._pos     = 0
+        self._eof     = False
+        self._decoder = json.JSONDecoder()
+        self._text    = codecs.getincrementaldecoder('utf-8')()
+
+    def iter_types(self):
+        """Generate raw type definitions (dicts) in the order they appear within the document."""
+        if self._peek() != '{':
+            raise Exception("GQLSchemaStream: Couldn't parse JSON schema (expected an object).")
+
+        for definition in self._walk_object(()):
+            yield definition
+
+        # GraphQL errors are reported the same way as by GQLSchema.send_request()
+        errors = self._levels.get((), {}).get('errors')
+        if errors:
+            raise Exception([error.get('message') for error in errors])
+
+        if self.schema is None:
+            raise Exception("GQLSchemaStream: Couldn't parse JSON schema (no list of types found).")
+
+    def _fill(self):
+        """Read the next chunk, the size grows with the amount of buffered data, so that retries are amortized."""
+        chunk = self.stream.read(max(self.chunk_size, len(self._buf) - self._pos))
+        if not isinstance(chunk, str):
+            chunk = self._text.decode(chunk, final=not chunk)
+
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        if not chunk:
+            self._eof = True
+
+    def _peek(self):
+        """Skip whitespace and return the next character (empty string at the end of the stream)."""
+        while True:
+            self._pos = self.WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf) or self._eof:
+                return self._buf[self._pos:self._pos + 1]
+            self._fill()
+
+    def _expect(self, character):
+        if self._peek() != character:
+            raise Exception("GQLSchemaStream: Couldn't parse JSON schema (expected '%s' at position %d)." % (
+                character, self._pos))
+        self._pos += 1
+
+    def _decode(self):
+        """Decode a complete JSON value, reading more data until it is available."""
+        while True:
+            self._peek()
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except ValueError:
+                if self._eof:
+                    raise
+                self._fill()
+                continue
+
+            # a number at the very end of the buffer might continue in the next chunk
+            if end == len(self._buf) and not self._eof:
+                self._fill()
+                continue
+
+            self._pos = end
+            return value
+
+    def _walk_object(self, path):
+        self._expect('{')
+        values = self._levels.setdefault(path, {})
+
+        while True:
+            character = self._peek()
+            if character == '}':
+                self._pos += 1
+                return
+            if character == ',':
+                self._pos += 1
+                continue
+
+            key = self._decode()
+            self._expect(':')
+            child = path + (key,)
+
+            if child in self.TYPE_LISTS and self._peek() == '[':
+                # found the schema, everything else on this level describes it
+                self.schema = values
+                for definition in self._walk_array():
+                    yield definition
+            elif child in self.ROUTES and self._peek() == '{':
+                for definition in self._walk_object(child):
+                    yield definition
+            else:
+                values[key] = self._decode()
+
+    def _walk_array(self):
+        self._expect('[')
+
+        while True:
+            character = self._peek()
+            if character == ']':
+                self._pos += 1
+                return
+            if character == ',':
+                self._pos += 1
+                continue
+
+            yield self._decode()
@@ -0,0 +1,263 @@
+# coding: utf-8
+from __future__ import unicode_literals
+from builtins import object, str
+from collections import OrderedDict
+import gqlspection
+
+
+class GQLSelection(object):
+    """Immutable node of a generated selection tree: a field along with its arguments and selection set.
+
+      - 'name'        field name (or the header of an operation, e.g. 'query' or 'mutation Name')
+      - 'arguments'   tuple of rendered arguments, e.g. ('id: ID!',)
+      - 'type'        name of the field type (without modifiers)
+      - 'selections'  tuple of nested GQLSelection nodes, None for leaf fields
+      - 'truncated'   set if the selection has been cut off by the depth limit
+      - 'modifiers'   LIST / NON_NULL wrappers of the field type, outermost first (see GQLTypeKind)
+      - 'alias'       alias of the field in the response (None if the field isn't aliased)
+      - 'size'        number of fields in the subtree (including the node itself)
+
+    Nodes are hash-consed (see intern()): structurally identical subtrees are the very same object, so a tree that
+    repeats the selection of a popular type over and over again takes the memory of a single copy. Identity comparison
+    is enough to detect identical subtrees, which is what caching, deduplication (fragments) and analyses rely on.
+    Intern tables of schemas only keep weak references, nodes are released once no operation (or cache) uses them.
+
+    Serialisers: iter_lines() (the indented / oneliner output of GQLQuery.str), minimized() and json().
+    """
+    __slots__ = ('name', 'arguments', 'type', 'selections', 'truncated', 'modifiers', 'alias', 'size', '_headers',
+                 '__weakref__')
+
+    MAX_DEPTH_MARKER = '!!! MAX RECURSION DEPTH REACHED !!!'
+
+    def __init__(self, name, arguments=(), type=None, selections=None, truncated=False, modifiers=(), alias=None):
+        self.name       = name
+        self.arguments  = arguments
+        self.type       = type
+        self.selections = selections
+        self.truncated  = truncated
+        self.modifiers  = modifiers
+        self.alias      = alias
+        self.size       = 1 + sum(child.size for child in selections or ())
+
+        # first lines of the node are rendered once: with spaces (pad >= 0) and without them (pad=None)
+        self._headers = tuple(
+            ''.join((
+                (alias + ':' + space) if alias else "",
+                name,
+                "({arguments})".format(arguments=(',' + space).join(arguments)) if arguments else "",
+                (space + '{') if selections is not None else ""
+            )) for space in (' ', '')
+        )
+
+    @staticmethod
+    def intern(table, name, arguments=(), type=None, selections=None, truncated=False, modifiers=(), alias=None):
+        """Return the canonical node from the intern table (see GQLSchema), creating it if needed.
+
+        Nested nodes are interned already, so they are compared by identity and the key of a node is cheap to hash.
+        """
+        key = (name, arguments, type, selections, truncated, modifiers, alias)
+        node = table.get(key)
+        if node is None:
+            node = table[key] = GQLSelection(name, arguments, type, selections, truncated, modifiers, alias)
+        return node
+
+    def with_selections(self, table, selections):
+        """Return the (interned) node that is the same as this one, except for the selection set."""
+        return GQLSelection.intern(table, self.name, self.arguments, self.type, selections, self.truncated,
+                                   self.modifiers, self.alias)
+
+    def with_alias(self, table, alias):
+        """Return the (interned) node that is the same as this one, selected under the alias."""
+        return GQLSelection.intern(table, self.name, self.arguments, self.type, self.selections, self.truncated,
+                                   self.modifiers, alias)
+
+    def __repr__(self):
+        return 'GQLSelection({header}, size={size})'.format(header=self._headers[0], size=self.size)
+
+    def header(self, SPACE=' '):
+        """First line of the node: name, arguments and the opening brace of the selection set (if any)."""
+        return self._headers[0 if SPACE else 1]
+
+    def iter_lines(self, writer, level=0, fragments=None):
+        """Generate formatted lines of the node and its selection set (see GQLWriter for the formatting).
+
+        With 'fragments' (GQLFragments), nested selection sets are replaced by fragment spreads.
+        """
+        return GQLSelection.iter_nodes_lines(writer, (self,), level, fragments, inline=1)
+
+    @staticmethod
+    def iter_nodes_lines(writer, nodes, level, fragments=None, inline=1):
+        """Generate formatted lines of the nodes, starting at the nesting level.
+
+        The tree is walked with an explicit stack, so very deep trees don't hit the interpreter recursion limit. With
+        'fragments', only selection sets of the first 'inline' levels of nodes are expanded, deeper ones get replaced by
+        fragment spreads (that are then defined by the caller, see GQLFragments).
+        """
+        SPACE   = writer.SPACE
+        marker  = GQLSelection.MAX_DEPTH_MARKER
+        stack   = [iter(nodes)]
+        closers = [False]
+
+        while stack:
+            current_level = level + len(stack) - 1
+            for node in stack[-1]:
+                yield writer.format(node.header(SPACE), current_level)
+                if node.selections is None:
+                    if node.truncated:
+                        yield writer.format(marker, current_level + 1)
+                    continue
+
+                if fragments is not None and len(stack) > inline:
+                    yield writer.format('...' + fragments.spread(node), current_level + 1)
+                    yield writer.format('}', current_level)
+                    continue
+
+                if node.truncated:
+                    yield writer.format(marker, current_level + 1)
+                # descend into the selection set, current frame will be resumed afterwards
+                stack.append(iter(node.selections))
+                closers.append(True)
+                break
+            else:
+                stack.pop()
+                if closers.pop():
+                    yield writer.format('}', current_level - 1)
+
+    def minimized(self):
+        """Serialise the node into the shortest valid form: no comments, no indentation and a space only where two names
+        would merge otherwise. Selection sets cut off by the depth limit select '__typename' instead of the marker.
+        """
+        arguments = {}
+        parts     = []
+        stack     = [iter((self,))]
+
+        def append(text):
+            if parts and _is_name_char(parts[-1][-1]) and _is_name_char(text[0]):
+                parts.append(' ')
+            parts.append(text)
+
+        while stack:
+            for node in stack[-1]:
+                for text in node._minimized_field(arguments):
+                    append(text)
+                if node.selections is not None:
+                    append('{')
+                    if node.truncated and not node.selections:
+                        append('__typename')
+                    stack.append(iter(node.selections))
+                    break
+            else:
+                stack.pop()
+                if stack:
+                    append('}')
+        return ''.join(parts)
+
+    def _minimized_field(self, arguments):
+        """Minimized parts of the field itself: alias, name and arguments ('arguments' caches minimized arguments)."""
+        from gqlspection.utils import minimize_query
+
+        if self.alias:
+            yield self.alias + ':'
+        yield self.name
+        if self.arguments:
+            if self.arguments not in arguments:
+                arguments[self.arguments] = minimize_query('(' + ','.join(self.arguments) + ')')
+            yield arguments[self.arguments]
+
+    def json(self):
+        """Serialise the node into JSON compatible structure of dicts and lists.
+
+        Dicts of shared subtrees are built only once and referenced from every place the subtree appears in.
+        """
+        built = {}
+        stack = [self]
+        while stack:
+            node = stack[-1]
+            if id(node) in built:
+                stack.pop()
+                continue
+            pending = [child for child in node.selections or () if id(child) not in built]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            built[id(node)] = node._json(built)
+        return built[id(self)]
+
+    def _json(self, built):
+        result = OrderedDict(name=self.name)
+        if self.alias:
+            result['alias'] = self.alias
+        if self.arguments:
+            result['arguments'] = list(self.arguments)
+        if self.type is not None:
+            result['type'] = self.type
+        if self.selections is not None:
+            result['selections'] = [built[id(child)] for child in self.selections]
+        if self.truncated:
+            result['truncated'] = True
+        return result
+
+
+def _is_name_char(c):
+    return c.isalnum() or c == '_'
+
+
+class GQLFragments(object):
+    """Named fragments of a document, one per distinct selection set.
+
+    Thanks to hash-consing (see GQLSelection), a selection set that appears in many places (the same type reached at
+    any depth that is enough to select all of its leaves, or through different paths) is a single fragment. Fragments
+    are named after the type ('UserFields'), other selection sets of the same type get numbered ('UserFields2', ...).
+
+    The same object may be shared between operations of a document, so that every fragment is defined only once. Shared
+    fragments are only spread by the operations, definitions of all of them are written at the end of the document
+    (see iter_lines() / write()).
+    """
+    _names   = None
+    _counts  = None
+    _pending = None
+
+    def __init__(self):
+        self._names   = {}
+        self._counts  = {}
+        self._pending = []
+
+    def spread(self, node):
+        """Return the name of the fragment with the selection set of the node, register it if it's new."""
+        key = (node.type, node.selections, node.truncated)
+        name = self._names.get(key)
+        if name is None:
+            count = self._counts[node.type] = self._counts.get(node.type, 0) + 1
+            name = self._names[key] = node.type + 'Fields' + (str(count) if count > 1 else '')
+            self._pending.append((name, node))
+        return name
+
+    def iter_pending(self):
+        """Yield '(name, node)' of fragments that haven't been defined yet, including the ones registered while the
+        previous ones are being rendered.
+        """
+        while self._pending:
+            yield self._pending.pop(0)
+
+    def iter_lines(self, writer):
+        """Generate definitions of the fragments spread so far (which haven't been defined yet), each of them preceded by
+        a separator from the previous definition (or operation).
+        """
+        for name, node in self.iter_pending():
+            yield writer.NEWLINE or writer.SPACE
+            yield writer.format('fragment {name} on {type}{space}{{'.format(name=name, type=node.type,
+                                                                            space=writer.SPACE))
+            if node.truncated:
+                yield writer.format(GQLSelection.MAX_DEPTH_MARKER, 1)
+            for line in GQLSelection.iter_nodes_lines(writer, node.selections, 1, self, inline=0):
+                yield line
+            yield '}'
+
+    def str(self, pad=4):
+        """Definitions of the pending fragments (see GQLQuery.str() for the meaning of 'pad')."""
+        return ''.join(self.iter_lines(gqlspection.GQLWriter(pad)))
+
+    def write(self, writer):
+        """Write definitions of the pending fragments to a GQLWriter."""
+        writer.writelines(self.iter_lines(writer))
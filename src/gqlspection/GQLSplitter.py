@@ -0,0 +1,134 @@
+# coding: utf-8
+from __future__ import unicode_literals
+from builtins import object
+import gqlspection
+
+
+class GQLSplitter(object):
+    """Partitions selection trees (see GQLSelection) into parts that fit a size limit.
+
+      - 'max_bytes'   maximum size of a part in bytes, as rendered by GQLWriter with the provided 'pad'
+      - 'max_fields'  maximum number of fields selected within a part
+
+    Fields that don't fit get split into several copies, each of them selecting a part of the original selection set,
+    so that every part keeps the whole path from the root. Pieces are packed with the first fit decreasing heuristic,
+    which keeps the number of parts close to the smallest possible. A path to a single leaf field can't be split any
+    further, so if it alone exceeds the limit (e.g. it's too deep), it ends up in a part of its own anyway.
+    """
+    max_bytes  = None
+    max_fields = None
+    pad        = 4
+
+    def __init__(self, max_bytes=None, max_fields=None, pad=4):
+        if max_bytes is None and max_fields is None:
+            raise Exception("GQLSplitter: either 'max_bytes' or 'max_fields' is required")
+        self.max_bytes  = max_bytes
+        self.max_fields = max_fields
+        self.pad        = pad
+
+        writer = gqlspection.GQLWriter(pad)
+        self._space    = writer.SPACE
+        self._newline  = len(writer.NEWLINE)
+        self._step     = pad or 0
+        self._marker   = len(gqlspection.GQLSelection.MAX_DEPTH_MARKER.encode('utf-8')) + self._newline
+        # (bytes at level 0, number of lines) of measured subtrees
+        self._measures = {}
+
+    def split(self, nodes, table, overhead=0, level=1):
+        """Partition the nodes (selection set of an operation) into groups, return a list of tuples of nodes.
+
+        'overhead' is the size in bytes of everything in a part except for the nodes (e.g. the operation header), nodes
+        are rendered at the nesting 'level'. 'table' is the intern table for the copies of split fields.
+        """
+        capacity = (None if self.max_bytes is None else self.max_bytes - overhead, self.max_fields)
+
+        # every frame is the field being split (None for the operation), nesting level of its selection set, capacity
+        # for the selection set, an iterator over its selections, the pieces collected so far and its position
+        stack = [[None, level, capacity, enumerate(nodes), [], None]]
+        while True:
+            node, current_level, capacity, selections, pieces, position = stack[-1]
+            for index, child in selections:
+                size = self.size(child, current_level)
+                if child.selections and not self.fits(size, capacity):
+                    # split the nested selection set, current frame will be resumed afterwards
+                    stack.append([child, current_level + 1, self._inner(child, current_level, capacity),
+                                  enumerate(child.selections), [], index])
+                    break
+                pieces.append((index, child, size))
+            else:
+                stack.pop()
+                groups = self._pack(pieces, capacity)
+                if not stack:
+                    return groups
+                parent = stack[-1]
+                for group in groups:
+                    piece = node.with_selections(table, group)
+                    parent[4].append((position, piece, self.size(piece, parent[1])))
+
+    def measure(self, node):
+        """Return '(bytes, lines)' of the rendered subtree at the nesting level 0."""
+        measures = self._measures
+        stack = [node]
+        while stack:
+            current = stack[-1]
+            if current in measures:
+                stack.pop()
+                continue
+            pending = [child for child in current.selections or () if child not in measures]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+
+            size  = len(current.header(self._space).encode('utf-8')) + self._newline
+            lines = 1
+            if current.truncated:
+                size  += self._step + self._marker
+                lines += 1
+            if current.selections is not None:
+                for child in current.selections:
+                    child_size, child_lines = measures[child]
+                    size  += child_size + child_lines * self._step
+                    lines += child_lines
+                size  += 1 + self._newline
+                lines += 1
+            measures[current] = (size, lines)
+        return measures[node]
+
+    def size(self, node, level):
+        """Return '(bytes, fields)' of the subtree rendered at the nesting level."""
+        if self.max_bytes is None:
+            return 0, node.size
+        size, lines = self.measure(node)
+        return size + lines * self._step * level, node.size
+
+    def _inner(self, node, level, capacity):
+        """Capacity left for the selection set of the node, once its own lines (header, marker, brace) are subtracted."""
+        size, fields = capacity
+        if size is not None:
+            indent = self._step * level
+            size  -= 2 * indent + len(node.header(self._space).encode('utf-8')) + 1 + 2 * self._newline
+            if node.truncated:
+                size -= indent + self._step + self._marker
+        return size, (fields - 1 if fields is not None else None)
+
+    @staticmethod
+    def fits(size, capacity):
+        return all(limit is None or value <= limit for value, limit in zip(size, capacity))
+
+    @staticmethod
+    def _pack(pieces, capacity):
+        """Pack pieces into as few groups fitting the capacity as possible, keeping the original order within groups."""
+        groups = []
+        for order, (index, piece, size) in sorted(enumerate(pieces), key=lambda item: item[1][2], reverse=True):
+            for group in groups:
+                used = (group[0][0] + size[0], group[0][1] + size[1])
+                if GQLSplitter.fits(used, capacity):
+                    group[0] = used
+                    group[1].append((index, order, piece))
+                    break
+            else:
+                groups.append([size, [(index, order, piece)]])
+
+        groups.sort(key=lambda group: min(group[1]))
+        return [tuple(piece for _, _, piece in sorted(items)) for _, items in groups]
@@ -0,0 +1,132 @@
+# coding: utf-8
+from __future__ import unicode_literals
+from builtins import object
+from collections import OrderedDict
+from threading import Lock, local
+from timeit import default_timer
+
+
+class _NoOp(object):
+    """Context manager that does nothing, returned by GQLStats.phase() / GQLStats.activate() when stats are disabled."""
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_OP = _NoOp()
+# active collectors are per thread, worker threads are handed the collector explicitly (see GQLStats.activate)
+_active = local()
+
+
+class _Phase(object):
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name  = name
+
+    def __enter__(self):
+        self.started = default_timer()
+        return self.stats
+
+    def __exit__(self, *exc_info):
+        self.stats.add_time(self.name, default_timer() - self.started)
+        return False
+
+
+class _Activation(object):
+    def __init__(self, stats):
+        self.stats = stats
+
+    def __enter__(self):
+        self.previous, _active.stats = GQLStats.active(), self.stats
+        return self.stats
+
+    def __exit__(self, *exc_info):
+        _active.stats = self.previous
+        return False
+
+
+class GQLStats(object):
+    """Wall time of the phases of a run along with counters (types, fields, requests, rendered nodes, output bytes...).
+
+    Instrumented code reports to the active collector of the thread (GQLStats.active()), which is None unless collection
+    has been enabled with 'with stats:' (or through GQLSchema(stats=...)), so that disabled stats only cost a lookup per
+    phase. Threads collecting concurrently don't interfere, worker threads report to a collector once it's activated
+    in them. Phases may be nested ('schema' includes 'types' and 'link'), the time of repeated phases adds up.
+
+    'callback(phase, seconds, stats)' is called whenever a phase finishes.
+    """
+    timings  = None
+    counters = None
+    callback = None
+
+    def __init__(self, callback=None):
+        self.timings  = OrderedDict()
+        self.counters = OrderedDict()
+        self.callback = callback
+        # phases and counters may be reported from worker threads (chunked and bulk introspection)
+        self._lock    = Lock()
+
+    def __enter__(self):
+        self._activation = _Activation(self)
+        return self._activation.__enter__()
+
+    def __exit__(self, *exc_info):
+        return self._activation.__exit__(*exc_info)
+
+    @staticmethod
+    def active():
+        """The active collector of the current thread, None if stats are disabled."""
+        return getattr(_active, 'stats', None)
+
+    @staticmethod
+    def activate(stats):
+        """Context manager making 'stats' the active collector (does nothing if 'stats' is None)."""
+        return _Activation(stats) if stats is not None else _NO_OP
+
+    @staticmethod
+    def phase(name):
+        """Context manager measuring the wall time of the phase on the active collector, if any."""
+        stats = GQLStats.active()
+        return _Phase(stats, name) if stats is not None else _NO_OP
+
+    def timer(self, name):
+        """Context manager measuring the wall time of the phase on this collector."""
+        return _Phase(self, name)
+
+    @staticmethod
+    def record(name, value=1):
+        """Increase the counter on the active collector, if any."""
+        stats = GQLStats.active()
+        if stats is not None:
+            stats.count(name, value)
+
+    def add_time(self, phase, seconds):
+        with self._lock:
+            self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+        if self.callback:
+            self.callback(phase, seconds, self)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def as_dict(self):
+        return OrderedDict((('timings', OrderedDict(self.timings)), ('counters', OrderedDict(self.counters))))
+
+    def report(self):
+        """Human readable report of the collected stats."""
+        width = max([len(name) for name in list(self.timings) + list(self.counters)] + [10])
+        lines = ['Timings:']
+        lines += ['  {name:<{width}}  {seconds:>10.4f}s'.format(name=name, width=width, seconds=seconds)
+                  for name, seconds in self.timings.items()]
+        lines.append('Counters:')
+        lines += ['  {name:<{width}}  {value:>10}'.format(name=name, width=width, value=value)
+                  for name, value in self.counters.items()]
+        return '\n'.join(lines) + '\n'
+
+    def __repr__(self):
+        return "GQLStats(timings={timings}, counters={counters})".format(
+            timings=dict(self.timings), counters=dict(self.counters))
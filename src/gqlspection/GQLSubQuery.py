@@ -2,19 +2,72 @@
 from __future__ import unicode_literals
 from builtins import str, object
 import gqlspection
-from gqlspection.utils import pad_string
 
 
-class GQLSubQuery(object):
-    field       = None
-    name        = ''
-    description = ''
-    max_depth   = 4
+class GQLExpansion(object):
+    """Keeps track of the limits that depend on the path taken while an operation gets expanded.
+
+      - 'max_reentries' - how many times a type may be re-entered on the current path (0 means that a type already
+                          present on the path is never expanded again, None disables the check)
+      - 'node_budget'   - maximum number of fields to be selected within the whole operation (None is unlimited)
+
+    Fields that would violate the limits are left out of the selection. The node budget is a hard bound, '__typename'
+    fields selected instead of pruned selection sets included: room for a nested field is reserved whenever a selection
+    set is going to be built. Only the first field of an operation (and a field of its selection set) is selected even
+    if the budget is smaller than that.
+    """
+    max_reentries = None
+    node_budget   = None
+    nodes         = 0
+    _path         = None
+
+    def __init__(self, max_reentries=None, node_budget=None):
+        self.max_reentries = max_reentries
+        self.node_budget   = node_budget
+        self.nodes         = 0
+        self._path         = {}
+
+    @property
+    def limited(self):
+        """Whether the selections depend on the path taken (otherwise they only depend on type and remaining depth)."""
+        return self.max_reentries is not None or self.node_budget is not None
+
+    def fits(self, expands=False):
+        """Check whether the node budget has room for a field (and a field of its selection set if 'expands' is set)."""
+        return self.node_budget is None or self.nodes + (2 if expands else 1) <= self.node_budget
+
+    def allows(self, gqltype, closes, expands=False):
+        """Check whether a field of the provided type (which is non-final if 'closes' is set, and gets its selection set
+        built if 'expands' is set) may be selected."""
+        if not self.fits(expands):
+            return False
+        if closes and self.max_reentries is not None:
+            return self._path.get(gqltype.name, 0) <= self.max_reentries
+        return True
 
-    def __init__(self, field, max_depth=5):
-        self.field        = field
-        self.name         = field.name
-        self.max_depth    = max_depth - 1
+    def enter(self, gqltype):
+        self._path[gqltype.name] = self._path.get(gqltype.name, 0) + 1
+
+    def leave(self, gqltype):
+        self._path[gqltype.name] -= 1
+
+
+class GQLSubQuery(object):
+    field         = None
+    name          = ''
+    description   = ''
+    max_depth     = 4
+    max_reentries = None
+    node_budget   = None
+
+    MAX_DEPTH_MARKER = gqlspection.GQLSelection.MAX_DEPTH_MARKER
+
+    def __init__(self, field, max_depth=5, max_reentries=None, node_budget=None):
+        self.field         = field
+        self.name          = field.name
+        self.max_depth     = max_depth - 1
+        self.max_reentries = max_reentries
+        self.node_budget   = node_budget
 
     def __repr__(self):
         self.str()
@@ -22,20 +75,6 @@ class GQLSubQuery(object):
     def __str__(self):
         self.str()
 
-    @staticmethod
-    def _indent(indent):
-        """Generates characters that should be used for Space and Newline, depending on request indentation level.
-
-        If indent > 0, space is preserved and new lines are started with 'indent' number of spaces.
-        If indent = 0, space is preserved, but new lines are removed
-        If indent = None, both space and newlines are trimmed.
-        """
-        NEWLINE = '\n' if indent else ''
-        PADDING = ' ' * indent if indent else ''
-        SPACE   = ' '  if (indent is not None) else ''
-
-        return SPACE, NEWLINE, PADDING
-
     def str(self, pad=4):
         """Generate a string representation.
 
@@ -43,36 +82,151 @@ class GQLSubQuery(object):
         'pad=0'    generates minimized query (oneliner without comments).
         'pad=None' generates super-optimized query where spaces are omitted as much as possible
         """
-        # whitespace characters collapse when query gets minimized
-        SPACE, NEWLINE, PADDING = self._indent(pad)
-
-        arguments = (',' + SPACE).join([str(x) for x in self.field.args])
-
-        first_line = ''.join((
-            self.name,
-            "({arguments})".format(arguments=arguments) if arguments else "",
-            (SPACE + "{" + NEWLINE) if not self.field.type.kind.is_final else NEWLINE
-        ))
-
-        middle_lines = ''
-        if self.max_depth:
-            for field in self.field.type.fields:
-                subquery = GQLSubQuery(field, max_depth=self.max_depth)
-                middle_lines += NEWLINE.join(subquery.str(pad).splitlines()) + NEWLINE
+        return ''.join(self.iter_lines(pad))
+
+    def iter_lines(self, pad=4):
+        """Lazily generate the string representation line by line (see str() for the meaning of 'pad')."""
+        return self._iter_lines(gqlspection.GQLWriter(pad))
+
+    def write(self, writer, level=0):
+        """Write the subquery to a GQLWriter, starting at the provided nesting level."""
+        writer.writelines(self._iter_lines(writer, level))
+
+    def _iter_lines(self, writer, level=0):
+        if writer.pad and self.description:
+            for line in gqlspection.utils.format_comment(self.description).splitlines():
+                yield writer.format(line, level)
+
+        for line in self.selection().iter_lines(writer, level):
+            yield line
+
+    def selection(self, expansion=None):
+        """Build the selection tree of the field (GQLSelection), within the limits tracked by 'expansion'."""
+        if expansion is None:
+            expansion = GQLExpansion(self.max_reentries, self.node_budget)
+
+        field = self.field
+        expansion.nodes += 1
+        if not field.type.kind.is_final:
+            build = GQLSubQuery._limited_selection_set if expansion.limited else GQLSubQuery._selection_set
+            selections = build(field.type, self.max_depth, expansion)
         else:
-            # Max recursion depth reached
-            middle_lines = '!!! MAX RECURSION DEPTH REACHED !!!' + NEWLINE
-        middle_lines = pad_string(middle_lines, pad)
+            selections = None
+        return GQLSubQuery._field_node(field, field.type, selections, self.max_depth)
 
-        last_line = '}' + NEWLINE if not self.field.type.kind.is_final else ""
+    def cost(self, cost_model=None):
+        """Estimated cost of the field for the server (see GQLCost)."""
+        return (cost_model or gqlspection.GQLCost()).estimate(self.selection())
+
+    @staticmethod
+    def _field_node(field, gqltype, selections, max_depth):
+        """Intern the node of the field, selecting 'selections' (None for leaf fields) at the remaining depth."""
+        return gqlspection.GQLSelection.intern(
+            gqltype.schema._selections,
+            field.name,
+            tuple(str(x) for x in field.args),
+            gqltype.name,
+            selections,
+            max_depth <= 0,
+            field.kind.modifiers
+        )
 
-        if pad:
-            if self.description:
-                description_line = gqlspection.utils.format_comment(self.description) + NEWLINE
+    @staticmethod
+    def _selection_set(gqltype, max_depth, expansion=None):
+        """Build the selection set of a type at the remaining depth (a tuple of GQLSelection nodes).
+
+        Selection sets only depend on the type and the remaining depth, so they are kept in the schema's render cache
+        and reused between all places where the same type is reached (within the operation and across operations).
+        Nested selection sets are built with an explicit stack instead of recursion, so that very deep 'max_depth'
+        values don't hit the interpreter recursion limit.
+        """
+        if max_depth <= 0:
+            return ()
+
+        cache = gqltype.schema.render_cache
+        # selection sets built by this call, as the render cache may be bounded or disabled
+        built = {}
+
+        def lookup(child, depth):
+            if depth <= 0:
+                return ()
+            key = (child.name, depth)
+            if key not in built:
+                found = cache.find(key)
+                if found is None:
+                    return None
+                built[key] = found
+            return built[key]
+
+        # every frame is the type, its remaining depth, an iterator over fields, the nodes built so far and the field
+        # that waits for the nested selection set to be built
+        stack = [[gqltype, max_depth, iter(gqltype.fields), [], None]]
+        while stack:
+            frame = stack[-1]
+            current, depth, fields, nodes, waiting = frame
+            if waiting is not None:
+                nodes.append(GQLSubQuery._field_node(waiting, waiting.type, lookup(waiting.type, depth - 1), depth - 1))
+                frame[4] = None
+
+            for field in fields:
+                child = field.type
+                selections = None if child.kind.is_final else lookup(child, depth - 1)
+                if selections is None and not child.kind.is_final:
+                    # descend into the nested selection set, current frame will be resumed afterwards
+                    frame[4] = field
+                    stack.append([child, depth - 1, iter(child.fields), [], None])
+                    break
+                nodes.append(GQLSubQuery._field_node(field, child, selections, depth - 1))
             else:
-                description_line = ''
-            result = description_line + first_line + middle_lines + last_line
-        else:
-            result = first_line + middle_lines + last_line
+                stack.pop()
+                built[(current.name, depth)] = cache.store((current.name, depth), tuple(nodes))
+
+        return built[(gqltype.name, max_depth)]
+
+    @staticmethod
+    def _limited_selection_set(gqltype, max_depth, expansion):
+        """Build the selection set of a type, leaving out fields that would violate the limits of 'expansion'.
 
-        return result
+        If some fields get left out and nothing else remains in a selection set, '__typename' is selected instead to
+        keep the query valid. Selections depend on the path here, so nothing gets cached (identical subtrees are still
+        shared thanks to interning).
+        """
+        if max_depth <= 0:
+            return ()
+
+        table = gqltype.schema._selections
+        # every frame is the type, its remaining depth, an iterator over fields, the nodes built so far, whether some
+        # fields got pruned and the field that waits for the nested selection set to be built
+        stack = [[gqltype, max_depth, iter(gqltype.fields), [], False, None]]
+        expansion.enter(gqltype)
+        while True:
+            frame = stack[-1]
+            current, depth, fields, nodes, _, waiting = frame
+            for field in fields:
+                child = field.type
+                closes = not child.kind.is_final
+                expands = closes and depth > 1
+                if not expansion.allows(child, closes, expands):
+                    frame[4] = True
+                    continue
+
+                expansion.nodes += 1
+                if expands:
+                    frame[5] = field
+                    stack.append([child, depth - 1, iter(child.fields), [], False, None])
+                    expansion.enter(child)
+                    break
+                nodes.append(GQLSubQuery._field_node(field, child, () if closes else None, depth - 1))
+            else:
+                stack.pop()
+                expansion.leave(current)
+                if frame[4] and not nodes:
+                    # the room is reserved by allows()
+                    expansion.nodes += 1
+                    nodes.append(gqlspection.GQLSelection.intern(table, '__typename', type='String',
+                                                                 modifiers=('NON_NULL',)))
+                if not stack:
+                    return tuple(nodes)
+                parent = stack[-1]
+                field, parent[5] = parent[5], None
+                parent[3].append(GQLSubQuery._field_node(field, current, tuple(nodes), depth))
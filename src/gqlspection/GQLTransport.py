@@ -0,0 +1,192 @@
+# coding: utf-8
+from __future__ import unicode_literals
+from builtins import bytes, object
+from contextlib import closing
+import random
+import time
+from gqlspection import log
+from gqlspection.GQLStats import GQLStats
+
+
+def _brotli_available():
+    # urllib3 decodes 'br' responses on its own, as long as one of these is installed
+    for module in ('brotli', 'brotlicffi'):
+        try:
+            __import__(module)
+            return True
+        except ImportError:
+            continue
+    return False
+
+
+class GQLResponseReader(object):
+    """File-like view of a streamed (and already decompressed) HTTP response body.
+
+    Reads return as much data as requested unless the body is over, which is what incremental decoders such as
+    GQLSchemaStream expect (a raw urllib3 response may return empty chunks mid-body while decompressing).
+    """
+    chunk_size = 64 * 1024
+    # number of (decompressed) bytes received so far
+    size       = 0
+
+    def __init__(self, response, chunk_size=64 * 1024):
+        self.chunk_size = chunk_size
+        self.size       = 0
+        self._chunks    = response.iter_content(chunk_size)
+        self._buffer    = b''
+
+    def read(self, size=-1):
+        parts, length = [self._buffer], len(self._buffer)
+        while size is None or size < 0 or length < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            parts.append(chunk)
+            length += len(chunk)
+            self.size += len(chunk)
+
+        data = bytes(b''.join(parts))
+        if size is None or size < 0:
+            size = len(data)
+        self._buffer = data[size:]
+        return data[:size]
+
+
+class GQLTransport(object):
+    """HTTP transport for introspection queries.
+
+    A single requests.Session is kept per transport, so connections are pooled and reused between requests (see
+    shared() for the instance used by GQLSchema by default). Responses are requested compressed (gzip, deflate and
+    brotli if the 'brotli' package is installed) and decompressed while being received. post() and post_batch()
+    buffer the whole body before decoding it; open() gives access to the streamed body instead (GQLSchema decodes
+    introspection results with GQLSchemaStream while they're being received).
+
+    Connection errors, timeouts and 429 / 5xx responses are retried up to 'retries' times, with exponential backoff
+    and random jitter. A 'Retry-After' header in seconds takes priority (HTTP dates are ignored), no delay is longer
+    than 'max_delay' seconds though. 'timeout' is passed to requests as is, so it's either a number of seconds or a
+    (connect, read) tuple.
+    """
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    timeout   = (10, 120)
+    retries   = 3
+    backoff   = 0.5
+    max_delay = 60
+    pool_size = 10
+    headers   = None
+    _session  = None
+    _shared   = None
+
+    def __init__(self, timeout=(10, 120), retries=3, backoff=0.5, pool_size=10, headers=None, max_delay=60):
+        self.timeout   = timeout
+        self.retries   = retries
+        self.backoff   = backoff
+        self.max_delay = max_delay
+        self.pool_size = pool_size
+        self.headers   = {
+            'Content-Type': 'application/json',
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip, deflate, br' if _brotli_available() else 'gzip, deflate'
+        }
+        self.headers.update(headers or {})
+
+    @classmethod
+    def shared(cls):
+        """Transport shared by all GQLSchema objects that haven't been given their own."""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    @property
+    def session(self):
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            self._session = requests.Session()
+            # retries are handled in open(), as they need to cover error statuses too
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=0)
+            self._session.mount('http://', adapter)
+            self._session.mount('https://', adapter)
+        return self._session
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def _delay(self, attempt, response=None):
+        retry_after = response.headers.get('Retry-After', '') if response is not None else ''
+        if retry_after.strip().isdigit():
+            delay = float(retry_after)
+        else:
+            delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)  # nosec - jitter, not cryptography
+        # a misbehaving server must not stall the whole run
+        return min(delay, self.max_delay)
+
+    def open(self, url, query, extra_headers=None):
+        """Send the query and return the response with the body not read yet (the caller should close it)."""
+        with GQLStats.phase('http'):
+            return self._open(url, {'query': query}, extra_headers)
+
+    def _open(self, url, body, extra_headers):
+        import requests
+
+        headers = dict(self.headers)
+        headers.update(extra_headers or {})
+
+        attempt = 0
+        while True:
+            GQLStats.record('requests')
+            try:
+                response = self.session.post(url, json=body, headers=headers, timeout=self.timeout, stream=True)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt >= self.retries:
+                    raise
+                delay, reason = self._delay(attempt), e
+            else:
+                if response.status_code not in self.RETRY_STATUSES:
+                    return response
+                if attempt >= self.retries:
+                    response.close()
+                    raise Exception("GQLTransport: %s responded with HTTP %d after %d attempts." % (
+                        url, response.status_code, attempt + 1))
+                delay, reason = self._delay(attempt, response), "HTTP %d" % response.status_code
+                response.close()
+
+            log.warn("Request to %s failed (%s), retrying in %.2fs.", url, reason, delay)
+            time.sleep(delay)
+            attempt += 1
+
+    def post(self, url, query, extra_headers=None):
+        """Send the query and decode the JSON response."""
+        with closing(self.open(url, query, extra_headers)) as response:
+            return self._decode(url, response)
+
+    def post_batch(self, url, queries, extra_headers=None):
+        """Send several queries in a single request (as a JSON array, for servers that support transport batching) and
+        return the list of decoded responses, one per query.
+        """
+        with GQLStats.phase('http'):
+            response = self._open(url, [{'query': query} for query in queries], extra_headers)
+        with closing(response):
+            result = self._decode(url, response)
+        if not isinstance(result, list) or len(result) != len(queries):
+            raise Exception("GQLTransport: %s doesn't support batched requests (a list of %d responses was expected)."
+                            % (url, len(queries)))
+        return result
+
+    @staticmethod
+    def _decode(url, response):
+        from gqlspection import json_backend
+
+        reader = GQLResponseReader(response)
+        try:
+            # the whole (decompressed) body is buffered first, so the phase includes receiving it
+            with GQLStats.phase('json'):
+                result = json_backend.load(reader)
+            GQLStats.record('response bytes', reader.size)
+            return result
+        except ValueError:
+            raise Exception("GQLTransport: %s responded with HTTP %d and a body that isn't valid JSON." % (
+                url, response.status_code))
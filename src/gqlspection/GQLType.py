@@ -5,15 +5,7 @@ import gqlspection
 
 
 class GQLType(object):
-    name = ''
-    kind = None
-    schema = None
-    description = ''
-    fields = None
-    interfaces = None
-    enums = None
-    args = None
-    url = ''
+    __slots__ = ('name', 'kind', 'schema', 'description', 'fields', 'interfaces', 'enums', 'args', 'url')
 
     def __init__(self, name, kind, schema, description='', fields=None, interfaces=None, enums=None, args=None, url=''):
         self.name = name
@@ -22,11 +14,11 @@ class GQLType(object):
         # Optional strings
         self.description = description
         self.url         = url
-        # Optional GQLWrappers
-        self.args       = args       or gqlspection.GQLArgs(schema, {})
-        self.fields     = fields     or gqlspection.GQLFields(schema, {})
-        self.interfaces = interfaces or gqlspection.GQLInterfaces(schema, {})
-        self.enums      = enums      or gqlspection.GQLEnums(schema, {})
+        # Optional GQLWrappers (shared empty wrappers are used for scalars, enums and so on)
+        self.args       = args       or gqlspection.GQLArgs.EMPTY
+        self.fields     = fields     or gqlspection.GQLFields.EMPTY
+        self.interfaces = interfaces or gqlspection.GQLInterfaces.EMPTY
+        self.enums      = enums      or gqlspection.GQLEnums.EMPTY
 
     @staticmethod
     def from_json(json, schema):
@@ -34,7 +26,7 @@ class GQLType(object):
 
         return GQLType(
             name=json['name'],
-            kind=gqlspection.GQLTypeKind.from_json(json),
+            kind=gqlspection.GQLTypeKind.from_json(json, schema),
             schema=schema,
             description=json.get('description', ''),
 
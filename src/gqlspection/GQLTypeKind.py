@@ -3,6 +3,10 @@ from __future__ import unicode_literals
 from builtins import object
 
 
+class GQLTypeRefTruncated(Exception):
+    """Type reference is nested deeper than the TypeRef fragment of the introspection query could describe."""
+
+
 class GQLTypeKind(object):
     """Construct a type out of GraphQL schema fragment.
 
@@ -41,36 +45,48 @@ class GQLTypeKind(object):
     leaf_types = ('SCALAR', 'ENUM')
     builtin_scalars = ('Int', 'Float', 'String', 'Boolean', 'ID')
 
-    # in the example above: [NON_NULL, LIST, NON_NULL]
-    modifiers = None
-    # in the example above: OBJECT
-    kind = None
-    # in the example above: 'BillingPlanV2'
-    name = None
+    __slots__ = (
+        # in the example above: (NON_NULL, LIST, NON_NULL)
+        'modifiers',
+        # in the example above: OBJECT
+        'kind',
+        # in the example above: 'BillingPlanV2'
+        'name'
+    )
 
     def __init__(self, name, kind, modifiers=None):
         self.name = name
         self.kind = kind
-        self.modifiers = modifiers or []
+        self.modifiers = tuple(modifiers) if modifiers else ()
 
     @staticmethod
-    def from_json(typedef):
+    def from_json(typedef, schema=None):
+        """Parse a typedef, identical type references within a schema share a single (interned) GQLTypeKind."""
         current = typedef
         modifiers = []
         while current['kind'] in GQLTypeKind.wrapping_types:
             # iterate through intermediate modifiers (LIST and NON_NULL)
             modifiers.append(current['kind'])
+            if 'ofType' not in current:
+                raise GQLTypeRefTruncated("GQLTypeKind: Type reference is truncated (%s...), introspection query needs "
+                                          "a deeper TypeRef fragment." % ' of '.join(modifiers))
             current = current['ofType']
 
         # by this time all modifiers should have been parsed, make sure the result is what we expect
         if current['kind'] not in GQLTypeKind.non_wrapping_types:
             raise Exception("GQLTypeKind: Type '%s' is of unknown kind: '%s'" % (typedef['name'], typedef['kind']))
 
-        return GQLTypeKind(
-            name=current['name'],
-            kind=current['kind'],
-            modifiers=modifiers
-        )
+        key = (current['name'], current['kind'], tuple(modifiers))
+        interned = schema._kinds if schema is not None else {}
+        kind = interned.get(key)
+        if kind is None:
+            kind = interned[key] = GQLTypeKind(
+                name=current['name'],
+                kind=current['kind'],
+                modifiers=modifiers
+            )
+
+        return kind
 
     # String representation (in the example above: "[BillingPlanV2!]!")
     def __repr__(self):
@@ -6,14 +6,24 @@ import gqlspection
 
 
 class GQLTypeProxy(object):
-    name = ''
-    schema = None
-    _upstream = None
+    __slots__ = ('name', 'schema', '_upstream')
     max_depth = 4
 
     def __init__(self, name, schema):
         self.name = name
         self.schema = schema
+        self._upstream = None
+
+    @staticmethod
+    def for_name(name, schema):
+        """Get the proxy for a type name, there is a single (interned) proxy per type name within a schema."""
+        if schema is None:
+            return GQLTypeProxy(name, schema)
+
+        proxy = schema._proxies.get(name)
+        if proxy is None:
+            proxy = schema._proxies[name] = GQLTypeProxy(name, schema)
+        return proxy
 
     @property
     def upstream(self):
@@ -21,13 +31,11 @@ class GQLTypeProxy(object):
         if self._upstream:
             return self._upstream
 
-        if self.name in self.schema.types:
+        try:
             self._upstream = self.schema.types[self.name]
             return self._upstream
-        else:
+        except KeyError:
             if log.is_debug:
-                import pdb
-                pdb.set_trace()
                 log.debug("Found an unknown type: '%s'. At this time following types are present in schema:", self.name)
                 for t in self.schema.types:
                     log.debug("    %s(%s) [%s]" % (type(t.name), t.name, t.kind.kind))
@@ -1,6 +1,6 @@
 # coding: utf-8
 from __future__ import absolute_import, unicode_literals
-from builtins import object
+from builtins import object, str
 from gqlspection import log
 import gqlspection
 from .utils import safe_get_list
@@ -14,20 +14,29 @@ class GQLWrapFactory(object):
         self.schema = schema
         self.json = json
 
+    def _wrap(self, wrapper, key):
+        # avoid allocating new wrappers for types that don't have the corresponding elements at all
+        return wrapper(self.schema, self.json) if safe_get_list(self.json, key) else wrapper.EMPTY
+
     def fields(self):
-        return GQLFields(self.schema, self.json)
+        return self._wrap(GQLFields, 'fields')
 
     def interfaces(self):
-        return GQLInterfaces(self.schema, self.json)
+        return self._wrap(GQLInterfaces, 'interfaces')
 
     def enums(self):
-        return GQLEnums(self.schema, self.json)
+        return self._wrap(GQLEnums, 'enumValues')
 
     def args(self):
-        return GQLArgs(self.schema, self.json)
+        return self._wrap(GQLArgs, 'inputFields')
 
 
 class GQLWrapper(gqlspection.GQLList):
+    __slots__ = ()
+
+    # Shared empty wrapper, set for each subclass below
+    EMPTY = None
+
     # This should be overwritten through inheritance
     @staticmethod
     def _extract_elements(schema, json):
@@ -41,37 +50,138 @@ class GQLWrapper(gqlspection.GQLList):
 
         super(GQLWrapper, self).__init__(elements)
 
+    @classmethod
+    def from_elements(cls, elements):
+        """Create the wrapper out of already built elements (e.g. restored from GQLSchemaCache)."""
+        if not elements and cls.EMPTY is not None:
+            return cls.EMPTY
+        wrapper = cls.__new__(cls)
+        gqlspection.GQLList.__init__(wrapper, elements)
+        return wrapper
+
 
 class GQLTypes(GQLWrapper):
+    __slots__ = ()
+
+    @staticmethod
+    def _raw_types(json):
+        # streamed introspection results yield type definitions one by one
+        if isinstance(json, gqlspection.GQLSchemaStream):
+            return json.iter_types()
+        return safe_get_list(json, 'types')
+
     def _extract_elements(self, schema, json):
-        elements = []
-        scalars = set()
-        for t in safe_get_list(json, 'types'):
-            el = gqlspection.GQLType.from_json(t, schema)
-            log.info("Adding new type definition: %s", el.name)
-            elements.append(el)
+        # streamed introspection results get decoded within this phase
+        with gqlspection.GQLStats.phase('types'):
+            elements = []
+            scalars = set()
+            for t in self._raw_types(json):
+                el = gqlspection.GQLType.from_json(t, schema)
+                log.info("Adding new type definition: %s", el.name)
+                elements.append(el)
+
+                if el.kind.kind == 'SCALAR':
+                    scalars.add(el.kind.name)
+
+            # populate standard types if not present in supplied schema
+            for scalar in gqlspection.GQLTypeKind.builtin_scalars:
+                log.info("Adding missing default scalar: %s" % scalar)
+                if scalar not in scalars:
+                    elements.append(self._builtin_scalar(scalar, schema))
+
+        gqlspection.GQLStats.record('types', len(elements))
+        return elements
 
-            if el.kind.kind == 'SCALAR':
-                scalars.add(el.kind.name)
+    @staticmethod
+    def _builtin_scalar(name, schema):
+        return gqlspection.GQLType(
+            name = name,
+            kind = gqlspection.GQLTypeKind(
+                name=name,
+                kind='SCALAR'
+            ),
+            description="Built-in scalar type.",
+            schema=schema
+        )
+
+
+class GQLLazyTypes(GQLTypes):
+    """GQLTypes flavor that keeps raw type definitions and materialises GQLType objects on first access only.
+
+    Types are reached through schema.query / schema.mutation and field traversal (GQLTypeProxy), so generating a single
+    query only builds the types that are actually needed. Iterating over all types materialises all of them.
+    """
+    __slots__ = ('_schema', '_raw', '_materialised')
 
-        # populate standard types if not present in supplied schema
+    def __init__(self, schema, json):
+        self._schema = schema
+        with gqlspection.GQLStats.phase('types'):
+            self._raw = dict(
+                (t['name'], t) for t in self._raw_types(json)
+                if not t['name'].startswith('__')
+            )
+        # populate standard types if not present in supplied schema (these get created from scratch)
         for scalar in gqlspection.GQLTypeKind.builtin_scalars:
-            log.info("Adding missing default scalar: %s" % scalar)
-            if scalar not in scalars:
-                elements.append(gqlspection.GQLType(
-                    name = scalar,
-                    kind = gqlspection.GQLTypeKind(
-                        name=scalar,
-                        kind='SCALAR'
-                    ),
-                    description="Built-in scalar type.",
-                    schema=schema
-                ))
+            self._raw.setdefault(scalar, None)
 
-        return elements
+        self._materialised = {}
+        self._elements = None
+        self._names = tuple(sorted(self._raw))
+        self._index = dict((name, position) for position, name in enumerate(self._names))
+
+    @property
+    def materialised(self):
+        """Number of types that have been built so far."""
+        return len(self._materialised)
+
+    def _materialise(self, name):
+        el = self._materialised.get(name)
+        if el is None:
+            json = self._raw[name]
+            if json is None:
+                el = self._builtin_scalar(name, self._schema)
+            else:
+                el = gqlspection.GQLType.from_json(json, self._schema)
+                log.info("Adding new type definition: %s", el.name)
+            self._materialised[name] = el
+        return el
+
+    def __getitem__(self, item):
+        if isinstance(item, str):
+            return self._materialise(item)
+        if isinstance(item, int):
+            return self._materialise(self._names[item])
+        raise Exception("GQLList: unknown type: %s", type(item))
+
+    def __iter__(self):
+        return (self._materialise(name) for name in self._names)
+
+    def __repr__(self):
+        return '\n'.join(['GQLLazyTypes'] + ['    ' + repr(el) for el in self])
+
+    def __bool__(self):
+        return not not self._names
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, item):
+        if isinstance(item, str):
+            return item in self._index
+
+        name = getattr(item, 'name', None)
+        return name in self._index and self._materialise(name) == item
+
+    def with_prefix(self, prefix):
+        return tuple(self._materialise(name) for name in self._prefixed_names(prefix))
+
+    def _replace(self, element):
+        self._materialised[element.name] = element
 
 
 class GQLFields(GQLWrapper):
+    __slots__ = ()
+
     @staticmethod
     def _extract_elements(schema, json):
         return (gqlspection.GQLField.from_json(field, schema) for field in safe_get_list(json, 'fields'))
@@ -90,18 +200,34 @@ class GQLInterfaces(GQLWrapper):
             }
           ],
     """
+    __slots__ = ()
+
     @staticmethod
     def _extract_elements(schema, json):
-        return (gqlspection.GQLTypeProxy(interface['name'], schema) for interface in safe_get_list(json, 'interfaces'))
+        return (
+            gqlspection.GQLTypeProxy.for_name(interface['name'], schema)
+            for interface in safe_get_list(json, 'interfaces')
+        )
 
 
 class GQLEnums(GQLWrapper):
+    __slots__ = ()
+
     @staticmethod
     def _extract_elements(schema, json):
         return (gqlspection.GQLEnum.from_json(enum) for enum in safe_get_list(json, 'enumValues'))
 
 
 class GQLArgs(GQLWrapper):
+    __slots__ = ()
+
     @staticmethod
     def _extract_elements(schema, json):
         return (gqlspection.GQLArg.from_json(arg, schema) for arg in safe_get_list(json, 'inputFields'))
+
+
+# GQLList is read-only, so a single empty instance of every wrapper can be shared by all types and fields
+GQLFields.EMPTY     = GQLFields(None, {})
+GQLInterfaces.EMPTY = GQLInterfaces(None, {})
+GQLEnums.EMPTY      = GQLEnums(None, {})
+GQLArgs.EMPTY       = GQLArgs(None, {})
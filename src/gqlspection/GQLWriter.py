@@ -0,0 +1,63 @@
+# coding: utf-8
+from __future__ import unicode_literals
+from builtins import object
+
+
+class GQLWriter(object):
+    """Writes indented lines of a query to a buffer or a file-like sink in a single pass.
+
+    The 'pad' parameter has the same meaning as in GQLQuery.str():
+
+      - 'pad > 0'    every line is indented by 'pad' spaces per level and terminated with a newline
+      - 'pad = 0'    indentation and newlines are omitted (oneliner), but spaces are preserved
+      - 'pad = None' same as 'pad = 0', additionally spaces are omitted where possible
+
+    If no sink is provided, output is accumulated in memory and can be retrieved through getvalue().
+    """
+    pad     = 4
+    sink    = None
+    SPACE   = ' '
+    NEWLINE = '\n'
+    _buffer = None
+    _indents = None
+
+    def __init__(self, pad=4, sink=None):
+        self.pad  = pad
+        self.sink = sink
+
+        # whitespace characters collapse when query gets minimized
+        self.NEWLINE = '\n' if pad else ''
+        self.SPACE   = ' '  if (pad is not None) else ''
+
+        self._buffer  = []
+        self._write   = sink.write if sink is not None else self._buffer.append
+        self._indents = ['']
+
+    def _indent(self, level):
+        if not self.pad:
+            return ''
+        while len(self._indents) <= level:
+            self._indents.append(' ' * (self.pad * len(self._indents)))
+        return self._indents[level]
+
+    def format(self, text, level=0):
+        """Format a single line of text, indented according to the nesting level (nothing is written)."""
+        return self._indent(level) + text + self.NEWLINE
+
+    def write(self, text):
+        """Write text as is."""
+        self._write(text)
+
+    def writelines(self, lines):
+        """Write an iterable of already formatted lines (e.g. output of GQLQuery.iter_lines())."""
+        write = self._write
+        for line in lines:
+            write(line)
+
+    def line(self, text, level=0):
+        """Write a single line of text, indented according to the nesting level."""
+        self._write(self.format(text, level))
+
+    def getvalue(self):
+        """Return everything that has been written so far (only if no external sink was provided)."""
+        return ''.join(self._buffer)
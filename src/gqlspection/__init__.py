@@ -3,36 +3,62 @@ from __future__ import unicode_literals
 from gqlspection.Logger import log
 
 from gqlspection.GQLArg import GQLArg
+from gqlspection.GQLBatcher import GQLBatcher
+from gqlspection.GQLCost import GQLCost
 from gqlspection.GQLEnum import GQLEnum
 from gqlspection.GQLField import GQLField
 from gqlspection.GQLList import GQLList
 from gqlspection.GQLQuery import GQLQuery
+from gqlspection.GQLRenderCache import GQLRenderCache
 from gqlspection.GQLSchema import GQLSchema
-from gqlspection.GQLSubQuery import GQLSubQuery
+from gqlspection.GQLSchemaCache import GQLSchemaCache
+from gqlspection.GQLSchemaStream import GQLSchemaStream
+from gqlspection.GQLStats import GQLStats
+from gqlspection.GQLSelection import GQLFragments, GQLSelection
+from gqlspection.GQLSplitter import GQLSplitter
+from gqlspection.GQLSubQuery import GQLExpansion, GQLSubQuery
+from gqlspection.GQLTransport import GQLResponseReader, GQLTransport
 from gqlspection.GQLType import GQLType
-from gqlspection.GQLTypeKind import GQLTypeKind
+from gqlspection.GQLTypeKind import GQLTypeKind, GQLTypeRefTruncated
 from gqlspection.GQLTypeProxy import GQLTypeProxy
-from gqlspection.GQLWrappers import GQLWrapFactory, GQLArgs, GQLEnums, GQLInterfaces, GQLFields, GQLTypes
+from gqlspection.GQLWriter import GQLWriter
+from gqlspection.GQLWrappers import GQLWrapFactory, GQLArgs, GQLEnums, GQLInterfaces, GQLFields, GQLTypes, \
+    GQLLazyTypes
 
 __all__ = [
     "log",
     "utils",
     "GQLArg",
+    "GQLBatcher",
+    "GQLCost",
     "GQLEnum",
+    "GQLExpansion",
     "GQLField",
+    "GQLFragments",
     "GQLList",
     "GQLQuery",
+    "GQLRenderCache",
     "GQLSchema",
+    "GQLSchemaCache",
+    "GQLSchemaStream",
+    "GQLSelection",
+    "GQLSplitter",
+    "GQLStats",
     "GQLSubQuery",
+    "GQLResponseReader",
+    "GQLTransport",
     "GQLType",
     "GQLTypeKind",
+    "GQLTypeRefTruncated",
     "GQLTypeProxy",
     "GQLWrapFactory",
     "GQLArgs",
     "GQLEnums",
     "GQLInterfaces",
     "GQLFields",
-    "GQLTypes"
+    "GQLTypes",
+    "GQLLazyTypes",
+    "GQLWriter"
 ]
 
 # CLI tool entrypoint
@@ -0,0 +1,78 @@
+# coding: utf-8
+"""Bulk introspection of many endpoints with asyncio (Python 3.7+ only, not imported by the package itself).
+
+Requests are still sent through the blocking GQLTransport, but they run in a thread pool driven from the event loop,
+so hundreds of endpoints are introspected concurrently. The total number of requests in flight is limited by
+'concurrency' and the number of requests to the same host by 'per_host'. Results are yielded in the order responses
+arrive, so they can be processed (e.g. written to disk) while the slower endpoints are still being waited for.
+"""
+import asyncio
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import gqlspection
+
+
+async def run_concurrently(urls, load, concurrency=10, per_host=2):
+    """Call 'load(url)' (a blocking function) for every URL and yield '(url, result)' pairs as soon as they're ready.
+
+    Exceptions raised by 'load' are yielded as results, so that a single failing endpoint doesn't stop the others.
+    """
+    loop = asyncio.get_running_loop()
+    limit = asyncio.Semaphore(concurrency)
+    hosts = defaultdict(lambda: asyncio.Semaphore(per_host))
+
+    async def run(executor, url):
+        async with hosts[urlsplit(url).netloc], limit:
+            try:
+                return url, await loop.run_in_executor(executor, load, url)
+            except Exception as e:
+                return url, e
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for task in asyncio.as_completed([run(executor, url) for url in urls]):
+            yield await task
+
+
+async def iter_schemas(urls, concurrency=10, per_host=2, extra_headers=None, transport=None, **kwargs):
+    """Introspect all URLs and yield '(url, GQLSchema or Exception)' pairs in the order responses arrive.
+
+    Keyword arguments are passed to GQLSchema as is.
+    """
+    own_transport = transport is None
+    if own_transport:
+        transport = gqlspection.GQLTransport(pool_size=concurrency)
+
+    # schemas are loaded in worker threads, stats are reported to the collector active here
+    kwargs.setdefault('stats', gqlspection.GQLStats.active())
+
+    def load(url):
+        return gqlspection.GQLSchema(url=url, extra_headers=extra_headers, transport=transport, **kwargs)
+
+    try:
+        async for result in run_concurrently(urls, load, concurrency=concurrency, per_host=per_host):
+            yield result
+    finally:
+        if own_transport:
+            transport.close()
+
+
+async def load_schemas(urls, concurrency=10, per_host=2, extra_headers=None, transport=None, **kwargs):
+    """Introspect all URLs, return a dict of 'url: GQLSchema or Exception' (in the order of 'urls')."""
+    results = {}
+    async for url, result in iter_schemas(urls, concurrency, per_host, extra_headers, transport, **kwargs):
+        results[url] = result
+    return dict((url, results[url]) for url in urls)
+
+
+def run_all(urls, load, callback, concurrency=10, per_host=2):
+    """Blocking wrapper around run_concurrently() for synchronous code (e.g. the CLI).
+
+    'callback(url, result)' is called from the calling thread as soon as each result is ready.
+    """
+    async def main():
+        async for url, result in run_concurrently(urls, load, concurrency=concurrency, per_host=per_host):
+            callback(url, result)
+
+    asyncio.run(main())
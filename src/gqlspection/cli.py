@@ -1,13 +1,14 @@
 # coding: utf-8
 from __future__ import print_function, unicode_literals
 import click
-import json
 import sys
 try:
     from pathlib import Path
 except ImportError:
     from pathlib2 import Path
-from gqlspection import log, GQLSchema
+import hashlib
+import re
+from gqlspection import log, GQLBatcher, GQLCost, GQLFragments, GQLSchema, GQLStats, GQLTransport, GQLWriter
 
 click.disable_unicode_literals_warning = True
 
@@ -21,6 +22,21 @@ CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
 @click.option(
     '-u', '--url', help="URL of the GraphQL endpoint with enabled introspection."
 )
+@click.option(
+    '-U', '--url-list', help="File with URLs of GraphQL endpoints (one per line), introspected concurrently. Schemas and "
+                             "generated operations are saved to the output directory."
+)
+@click.option(
+    '-o', '--output-dir', default='gqlspection-output', show_default=True, help="Output directory for --url-list."
+)
+@click.option(
+    '--concurrency', type=int, default=10, show_default=True, help="Maximum number of concurrent requests for "
+                                                                   "--url-list."
+)
+@click.option(
+    '--per-host', type=int, default=2, show_default=True, help="Maximum number of concurrent requests to the same host "
+                                                               "for --url-list."
+)
 @click.option(
     '-l', '--list', 'stuff_to_print', help="Parse GraphQL schema and list queries, mutations or both of them (valid "
                                            "values are: 'queries', 'mutations' or 'all')."
@@ -38,31 +54,157 @@ CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
     '-M', '--all-mutations', is_flag=True, help="Only print mutations (by default both queries and mutations are "
                                                 "printed)."
 )
+@click.option(
+    '-d', '--depth', 'max_depth', type=int, default=5, show_default=True, help="Maximum depth of generated queries."
+)
+@click.option(
+    '--max-reentries', type=int, help="How many times a type may be re-entered on the current path (0 never follows "
+                                      "cycles, unlimited by default). Operations may still grow exponentially with "
+                                      "the depth on big cyclic schemas, combine with --node-budget."
+)
+@click.option(
+    '--node-budget', type=int, help="Maximum number of fields selected within a single operation, __typename "
+                                    "included (unlimited by default)."
+)
+@click.option(
+    '--fragments', is_flag=True, help="Define nested selections once as named fragments (...TypeFields) instead of "
+                                      "repeating them inline."
+)
+@click.option(
+    '--cost-budget', type=float, help="Prune the most expensive branches of every operation until its estimated cost "
+                                      "fits the budget (unlimited by default)."
+)
+@click.option(
+    '--list-multiplier', type=float, default=10, show_default=True, help="Expected number of items of a list, used "
+                                                                         "to estimate the cost of operations."
+)
+@click.option(
+    '--max-bytes', type=int, help="Split operations into several ones of at most this many bytes each (every part "
+                                  "keeps the path from the root to the fields it selects)."
+)
+@click.option(
+    '--max-fields', type=int, help="Split operations into several ones selecting at most this many fields each."
+)
+@click.option(
+    '--batch-size', type=int, help="Pack up to this many root fields into a single operation (each of them selected "
+                                   "under a unique alias), within the --max-bytes / --max-fields limits."
+)
+@click.option(
+    '--json-batches', type=int, metavar='N', help="Print JSON arrays of N minimized operations (one array per line), "
+                                                  "for servers that support batched requests."
+)
+@click.option(
+    '--no-descriptions', is_flag=True, help="Don't request descriptions in the introspection query (roughly halves the "
+                                            "size of the response)."
+)
+@click.option(
+    '--type-depth', type=int, default=7, show_default=True, help="Nesting depth of type references requested in the "
+                                                                 "introspection query (increased automatically if "
+                                                                 "needed)."
+)
+@click.option(
+    '--chunk-size', type=int, help="Introspect the schema in chunks of this many types per request (for servers that "
+                                   "time out or cap the size of responses)."
+)
+@click.option(
+    '--no-cache', is_flag=True, help="Don't use the on-disk cache of parsed schemas (~/.cache/gqlspection)."
+)
+@click.option(
+    '--stats', 'stats_format', type=click.Choice(['text', 'json']), help="Print time spent in each phase of the run "
+                                                                         "along with object counters to stderr."
+)
+@click.option(
+    '--profile', metavar='FILE', help="Profile the run with cProfile and save the statistics to this file (view "
+                                      "them with 'python -m pstats FILE')."
+)
 @click.option(
     '-v', '--verbose', is_flag=True, help="Enable verbose logging."
 )
-def cli(file_=None, url=None, all_queries=False, all_mutations=False, query=None, mutation=None, stuff_to_print=None,
-        verbose=False):
+def cli(file_=None, url=None, url_list=None, output_dir=None, concurrency=10, per_host=2, all_queries=False,
+        all_mutations=False, query=None, mutation=None, stuff_to_print=None, max_depth=5, max_reentries=None,
+        node_budget=None, fragments=False, cost_budget=None, list_multiplier=10, max_bytes=None, max_fields=None,
+        batch_size=None, json_batches=None, no_descriptions=False, type_depth=7, chunk_size=None, no_cache=False,
+        stats_format=None, profile=None, verbose=False):
     if verbose:
         import logging
         log.logger.setLevel(logging.DEBUG)
+    if url_list and sys.version_info < (3, 7):
+        # gqlspection.aio is written with async / await
+        log.err("-U/--url-list requires Python 3.7+.")
+        sys.exit(1)
+    limits = dict(max_depth=max_depth, max_reentries=max_reentries, node_budget=node_budget, fragments=fragments,
+                  cost_model=GQLCost(list_multiplier=list_multiplier), cost_budget=cost_budget, max_bytes=max_bytes,
+                  max_fields=max_fields, batch_size=batch_size, json_batches=json_batches)
+    introspection = dict(descriptions=not no_descriptions, depth=type_depth, chunk_size=chunk_size)
+    stats = GQLStats() if stats_format else None
+    profiler = start_profiler() if profile else None
     try:
-        run(file_, url, all_queries, all_mutations, query, mutation, stuff_to_print)
+        with GQLStats.activate(stats), GQLStats.phase('total'):
+            if url_list:
+                run_bulk(url_list, output_dir, select_operations(all_queries, all_mutations, query, mutation),
+                         concurrency=concurrency, per_host=per_host, introspection=introspection, **limits)
+            else:
+                run(file_, url, all_queries, all_mutations, query, mutation, stuff_to_print, cache=not no_cache,
+                    introspection=introspection, **limits)
     except Exception:
         import traceback
         traceback.print_exc()
         sys.exit()
+    finally:
+        report(stats, stats_format, profiler, profile)
 
     sys.exit(0)
 
 
-def run(file_, url, all_queries, all_mutations, query, mutation, stuff_to_print):
-    schema = parse_schema(file_, url)
+def start_profiler():
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def report(stats, stats_format, profiler, profile):
+    """Save profiler statistics and print collected stats (if enabled)."""
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(profile)
+        click.echo("Profile saved to {path}".format(path=profile), err=True)
+
+    if stats and stats_format == 'json':
+        from gqlspection import json_backend
+        click.echo(json_backend.dumps(stats.as_dict(), indent=2), err=True)
+    elif stats:
+        click.echo(stats.report(), err=True, nl=False)
+
+
+def run(file_, url, all_queries, all_mutations, query, mutation, stuff_to_print, max_depth=5, max_reentries=None,
+        node_budget=None, fragments=False, cost_model=None, cost_budget=None, max_bytes=None, max_fields=None,
+        batch_size=None, json_batches=None, cache=False, introspection=None):
+    if stuff_to_print and file_:
+        # fast path: only root types are needed for listing, avoid decoding the whole file
+        data = Path(file_).read_text()
+        roots = GQLSchema.extract_root_types(data)
+        print_available_stuff(GQLSchema(json=roots or data, lazy=True), stuff_to_print)
+        return
+
+    # when listing or only some operations are requested, there is no need to build the whole type graph
+    schema = parse_schema(file_, url, lazy=bool(stuff_to_print or query or mutation), cache=cache,
+                          introspection=introspection)
 
     if stuff_to_print:
         print_available_stuff(schema, stuff_to_print)
         return
 
+    # print queries & mutations, streaming output line by line instead of building whole documents in memory
+    write_operations(schema, GQLWriter(pad=4, sink=sys.stdout),
+                     select_operations(all_queries, all_mutations, query, mutation),
+                     max_depth=max_depth, max_reentries=max_reentries, node_budget=node_budget, fragments=fragments,
+                     cost_model=cost_model, cost_budget=cost_budget, max_bytes=max_bytes, max_fields=max_fields,
+                     batch_size=batch_size, json_batches=json_batches)
+
+
+def select_operations(all_queries, all_mutations, query, mutation):
+    """Convert command line flags to 'queries' & 'mutations' arguments of GQLSchema.iter_operations()."""
     # if explicit queries (-q) or mutations (-m) provided, they take priority
     if query or mutation:
         all_queries = all_mutations = False
@@ -70,45 +212,118 @@ def run(file_, url, all_queries, all_mutations, query, mutation, stuff_to_print)
     elif not all_queries and not all_mutations:
         all_queries = all_mutations = True
 
-    # print queries
-    if all_queries or query:
-        if all_queries:
-            queries_to_print = schema.query.fields
-        else:
-            queries_to_print = (schema.query.fields[q] for q in query.split(','))
+    return dict(
+        queries   = True if all_queries   else (query.split(',')    if query    else False),
+        mutations = True if all_mutations else (mutation.split(',') if mutation else False)
+    )
 
-        for field in queries_to_print:
-            print(schema.generate_query(field).str(pad=4))
 
-    # print mutations
-    if schema.mutation and (all_mutations or mutation):
-        if all_mutations:
-            mutations_to_print = schema.mutation.fields
+def write_operations(schema, writer, operations, max_bytes=None, max_fields=None, batch_size=None, json_batches=None,
+                     **limits):
+    fragments = None
+    if limits.get('fragments') is True:
+        # all operations go to the same document, so every fragment gets defined only once (at the end)
+        fragments = limits['fragments'] = GQLFragments()
+    generated = schema.iter_operations(**dict(operations, **limits))
+
+    # JSON batches carry minimized operations, which are never longer than the oneliner (pad=0)
+    pad = 0 if json_batches else writer.pad
+    if batch_size:
+        generated = GQLBatcher(batch_size, max_bytes, max_fields, pad).batch(generated)
+    elif max_bytes is not None or max_fields is not None:
+        generated = (part for operation in generated for part in operation.split(max_bytes, max_fields, pad))
+
+    if json_batches:
+        write_json_batches(writer, generated, json_batches)
+        return
+    for operation in generated:
+        operation.write(writer)
+        writer.write('\n')
+    if fragments is not None:
+        fragments.write(writer)
+        writer.write('\n')
+
+
+def write_json_batches(writer, operations, size):
+    """Write JSON arrays of up to 'size' requests ({"query": ...}), one array per line."""
+    from gqlspection import json_backend
+
+    batch = []
+    for operation in operations:
+        batch.append({'query': operation.minimized()})
+        if len(batch) >= size:
+            writer.write(json_backend.dumps(batch) + '\n')
+            batch = []
+    if batch:
+        writer.write(json_backend.dumps(batch) + '\n')
+
+
+def endpoint_name(url):
+    """File name (without extension) for the output of the endpoint, e.g. 'api.example.com_v1_graphql_1a2b3c4d'.
+
+    The readable part drops the scheme and punctuation, so it ends with a short hash of the whole URL to keep names of
+    different endpoints unique.
+    """
+    readable = re.sub(r'[^A-Za-z0-9.-]+', '_', url.split('://', 1)[-1]).strip('_') or 'endpoint'
+    return readable + '_' + hashlib.sha256(url.encode('utf-8')).hexdigest()[:8]
+
+
+def run_bulk(url_list, output_dir, operations, concurrency=10, per_host=2, introspection=None, **limits):
+    """Introspect all endpoints from the file concurrently and save results as soon as each response arrives."""
+    from gqlspection import json_backend
+    from gqlspection.aio import run_all
+
+    urls = []
+    for line in Path(url_list).read_text().splitlines():
+        line = line.strip()
+        if line and not line.startswith('#') and line not in urls:
+            urls.append(line)
+
+    output = Path(output_dir)
+    if not output.is_dir():
+        output.mkdir(parents=True)
+    transport = GQLTransport(pool_size=concurrency)
+
+    def load(url):
+        # runs in a worker thread
+        result = GQLSchema.send_request(url, transport=transport, **(introspection or {}))
+        name = endpoint_name(url)
+        (output / (name + '.json')).write_text(json_backend.dumps(result))
+        with (output / (name + '.graphql')).open('w') as f:
+            write_operations(GQLSchema(json=result), GQLWriter(pad=4, sink=f), operations, **limits)
+        return output / name
+
+    def report(url, result):
+        if isinstance(result, Exception):
+            click.echo("FAILED {url}: {error}".format(url=url, error=result), err=True)
         else:
-            mutations_to_print = (schema.mutation.fields[m] for m in mutation.split(','))
+            click.echo("{url} -> {path}.graphql".format(url=url, path=result))
 
-        for field in mutations_to_print:
-            print(schema.generate_mutation(field).str(pad=4))
+    try:
+        run_all(urls, load, report, concurrency=concurrency, per_host=per_host)
+    finally:
+        transport.close()
 
 
-def parse_schema(file_, url):
+def parse_schema(file_, url, lazy=False, cache=False, introspection=None):
     # Parse GraphQL schema
     if file_:
-        response = json.loads(Path(file_).read_text())
-        return GQLSchema(json=response)
+        # the file is read incrementally, one type definition at a time (unless it has been parsed before and is cached)
+        with Path(file_).open('rb') as stream:
+            return GQLSchema(stream=stream, lazy=lazy, cache=cache)
     elif url:
-        return GQLSchema(url=url)
+        return GQLSchema(url=url, lazy=lazy, introspection=introspection)
     else:
         log.err("Either file or url should be provided.")
         sys.exit(1)
 
 
 def print_available_stuff(schema, stuff_to_print):
-    # List stuff if that's what we're asked to do
+    # List stuff if that's what we're asked to do. Only the root types get materialised here (the schema is lazy), so
+    # this stays fast even on huge schemas.
     if stuff_to_print in ('queries', 'all'):
         for query in schema.query.fields:
-            # TODO: Would be nice to print a full prototype (with args) here
-            print("query %s" % query.name)
+            print("query %r" % query)
     if stuff_to_print in ('mutations', 'all') and schema.mutation:
         for mutation in schema.mutation.fields:
-            print("mutation %s" % mutation.name)
+            print("mutation %r" % mutation)
@@ -1,117 +1,227 @@
 # coding: utf-8
 from __future__ import unicode_literals
 
+# Number of nested 'ofType' levels within TypeRef fragment. 7 levels (as in graphql-js) describe any type reference
+# with up to three levels of nested lists, e.g. [[[String!]!]!]!
+DEFAULT_DEPTH = 7
+# Upper limit for adaptive introspection (see GQLSchema)
+MAX_DEPTH = 32
 
-__documented_introspection_query = """
-query IntrospectionQuery {
-    __schema {
+__introspection_query_template = """
+query IntrospectionQuery {{
+    __schema {{
         # Typically query is called "Query" and mutation "Mutation", but those can be redefined.
         # For some reason, spec does not force queryType[name] to be String!, but I don't think it can be null.
-        queryType {
+        queryType {{
             name
-            }
-        }
+        }}
         # 'mutationType' can be null if there are no mutations.
-        mutationType {
+        mutationType {{
             name
-        }
-        # TODO: We're not parsing subscriptions and directives at all right now
-        # subscriptionType { name }
-        # directives { name }
-        types {
+        }}
+        # TODO: We're not parsing subscriptions at all right now
+        # subscriptionType {{ name }}
+{directives}
+        types {{
+            {types}
+        }}
+    }}
+}}
+"""
+
+__directives_template = """
+        directives {{
             name
-            # 'kind' is enum with values: SCALAR, OBJECT, INTERFACE, UNION, ENUM, INPUT_OBJECT, LIST, NON_NULL
-            kind
-            description
-            # The following are only present for OBJECT and INTERFACE, otherwise null:
-            fields(includeDeprecated: true) {
-                name
-                description
-                args(includeDeprecated: true) {
-                    ... InputValue
-                }
-                type {
-                    ... TypeRef
-                }
-                isDeprecated
-                deprecationReason
-            }
-            interfaces {
-                ... TypeRef
-            }
-            # The following is only non-null for INTERFACE and UNION:
-            possibleTypes {
-                ... TypeRef
-            }
-            # The following is only non-null for ENUM:
-            enumValues(includeDeprecated: true) {
-                name
-                description
-                isDeprecated
-                deprecationReason
-            }
-            # The following is only non-null for INPUT_OBJECT:
-            inputFields(includeDeprecated: true) {
+            {description}
+            locations
+            args {{
                 ... InputValue
-            }
-            # The following is only non-null for LIST and NON_NULL:
-            ofType {
-                ... TypeRef
-            }
-            # Only (optionally) non-null for custom scalars:
-            specifiedByURL
-        }
-    }
-}
-
-fragment InputValue on __InputValue {
-  name
-  description
-  type { ...TypeRef }
-  defaultValue
-}
-
-# TODO: generate this query dynamically and make the depth adjustable
-fragment TypeRef on __Type {
-  kind
-  name
-  ofType {
-    kind
+            }}
+        }}
+"""
+
+# Chunked introspection: the full definitions of types are requested in batches (see get_types_query)
+__types_query_template = """
+query IntrospectionTypes {{
+{types}
+}}
+"""
+
+__type_template = """
+    {alias}: __type(name: {name}) {{
+        ... FullType
+    }}
+"""
+
+__full_type_template = """
+fragment FullType on __Type {{
     name
-    ofType {
-      kind
-      name
-      ofType {
-        kind
+    # 'kind' is enum with values: SCALAR, OBJECT, INTERFACE, UNION, ENUM, INPUT_OBJECT, LIST, NON_NULL
+    kind
+    {description}
+    # The following are only present for OBJECT and INTERFACE, otherwise null:
+    fields{include_deprecated} {{
         name
-        ofType {
-          kind
-          name
-          ofType {
-            kind
-            name
-            ofType {
-              kind
-              name
-              ofType {
-                kind
-                name
-              }
-            }
-          }
-        }
-      }
-    }
-  }
-}
+        {description}
+        args{include_deprecated} {{
+            ... InputValue
+        }}
+        type {{
+            ... TypeRef
+        }}
+        {is_deprecated}
+        {deprecation_reason}
+    }}
+    interfaces {{
+        ... TypeRef
+    }}
+    # The following is only non-null for INTERFACE and UNION:
+    possibleTypes {{
+        ... TypeRef
+    }}
+    # The following is only non-null for ENUM:
+    enumValues{include_deprecated} {{
+        name
+        {description}
+        {is_deprecated}
+        {deprecation_reason}
+    }}
+    # The following is only non-null for INPUT_OBJECT:
+    inputFields{include_deprecated} {{
+        ... InputValue
+    }}
+    # The following is only non-null for LIST and NON_NULL:
+    ofType {{
+        ... TypeRef
+    }}
+    # Only (optionally) non-null for custom scalars:
+    {specified_by_url}
+}}
 """
 
+__input_value_template = """
+fragment InputValue on __InputValue {{
+    name
+    {description}
+    type {{ ...TypeRef }}
+    defaultValue
+}}
+
+fragment TypeRef on __Type {{
+{type_ref}
+}}
+"""
+
+# built queries, keyed by the arguments of get_introspection_query()
+__queries = {}
+
+
+def _type_ref(depth):
+    """Body of the TypeRef fragment: kind & name of the type followed by 'depth' levels of nested 'ofType'."""
+    lines = []
+    for level in range(depth + 1):
+        indent = '    ' * (level + 1)
+        lines += [indent + 'kind', indent + 'name']
+        if level < depth:
+            lines.append(indent + 'ofType {')
+    for level in reversed(range(depth)):
+        lines.append('    ' * (level + 1) + '}')
+    return '\n'.join(lines)
+
 
-# TODO: 'depth' is ignored right now, fix it
-def get_introspection_query(depth=4, minimize=True):
-    """Construct the introspection query and optionally minimize it."""
+def _format(template, depth=DEFAULT_DEPTH, descriptions=True, deprecated=True, specified_by_url=True, directives=False,
+            **kwargs):
+    description = 'description' if descriptions else ''
+    query = template.format(
+        directives         = __directives_template.format(description=description) if directives else '',
+        description        = description,
+        include_deprecated = '(includeDeprecated: true)' if deprecated else '',
+        is_deprecated      = 'isDeprecated' if deprecated else '',
+        deprecation_reason = 'deprecationReason' if deprecated else '',
+        specified_by_url   = 'specifiedByURL' if specified_by_url else '',
+        type_ref           = _type_ref(depth),
+        **kwargs
+    )
+    # drop lines of disabled parts
+    return '\n'.join(line for line in query.splitlines() if line.strip()) + '\n'
+
+
+def build_introspection_query(depth=DEFAULT_DEPTH, descriptions=True, deprecated=True, specified_by_url=True,
+                              directives=False, full=True):
+    """Construct the (documented) introspection query:
+
+      - 'depth'            number of nested 'ofType' levels in type references (see DEFAULT_DEPTH)
+      - 'descriptions'     request descriptions of types, fields, arguments and enum values (typically the bulk of the
+                           response, disabling them roughly halves its size on big schemas)
+      - 'deprecated'       include deprecated fields, arguments & enum values along with the deprecation details
+                           (older servers don't support 'includeDeprecated' on arguments)
+      - 'specified_by_url' request 'specifiedByURL' of custom scalars (only supported since the October 2021 spec)
+      - 'directives'       request the list of directives
+
+    With 'full=False' only names and kinds of types are requested, their definitions can then be fetched in chunks
+    (see build_types_query).
+    """
+    fragments = __input_value_template if directives or full else ''
+    if full:
+        fragments = __full_type_template + fragments
+
+    return _format(__introspection_query_template + fragments, depth, descriptions, deprecated, specified_by_url,
+                   directives, types='... FullType' if full else 'name\n            kind')
+
+
+def build_types_query(names, depth=DEFAULT_DEPTH, descriptions=True, deprecated=True, specified_by_url=True, **kwargs):
+    """Construct the query for full definitions of the named types (aliased as t0, t1, ...), see
+    build_introspection_query for the options.
+    """
+    import json
+
+    types = ''.join(__type_template.format(alias='t%d' % i, name=json.dumps(name)) for i, name in enumerate(names))
+    return _format(__types_query_template + __full_type_template + __input_value_template, depth, descriptions,
+                   deprecated, specified_by_url, types=types)
+
+
+def get_introspection_query(depth=DEFAULT_DEPTH, descriptions=True, deprecated=True, specified_by_url=True,
+                            directives=False, minimize=True, full=True):
+    """Construct the introspection query (see build_introspection_query) and optionally minimize it.
+
+    Queries are only built once, subsequent calls with the same arguments return the cached string.
+    """
+    key = (depth, descriptions, deprecated, specified_by_url, directives, minimize, full)
+    query = __queries.get(key)
+    if query is None:
+        from gqlspection.utils import minimize_query
+        query = build_introspection_query(depth, descriptions, deprecated, specified_by_url, directives, full)
+        if minimize:
+            query = minimize_query(query)
+        __queries[key] = query
+    return query
+
+
+def get_types_query(names, minimize=True, **options):
+    """Construct the query for full definitions of the named types (see build_types_query), optionally minimized."""
     from gqlspection.utils import minimize_query
-    if minimize:
-        return minimize_query(__documented_introspection_query)
-    else:
-        return __documented_introspection_query
+
+    query = build_types_query(names, **options)
+    return minimize_query(query) if minimize else query
+
+
+def next_depth(depth):
+    """Depth of TypeRef fragment to retry with when type references got truncated (None if MAX_DEPTH is reached)."""
+    return min(depth * 2, MAX_DEPTH) if depth < MAX_DEPTH else None
+
+
+def has_truncated_type_refs(data):
+    """Check if the introspection result has type references nested deeper than the TypeRef fragment could describe.
+
+    These are wrapping types (LIST / NON_NULL) at the deepest level, where 'ofType' hasn't been requested.
+    """
+    pending = [data]
+    while pending:
+        current = pending.pop()
+        if isinstance(current, dict):
+            if current.get('kind') in ('LIST', 'NON_NULL') and 'ofType' not in current:
+                return True
+            pending.extend(current.values())
+        elif isinstance(current, list):
+            pending.extend(current)
+    return False
@@ -0,0 +1,121 @@
+# coding: utf-8
+"""Pluggable JSON backend.
+
+The fastest available library is picked on import (see BACKENDS for the order of preference), standard library 'json'
+is always available as a fallback and is the only option under Jython. The choice can be overridden with the
+GQLSPECTION_JSON_BACKEND environment variable (an unknown or missing backend is only reported with a warning there,
+the fastest available one is used instead) or by calling select().
+
+All backends accept both bytes and strings in loads() and return strings from dumps(). The output of dumps() is the
+same whichever backend is used: non-ASCII characters aren't escaped and there are no spaces, except after colons in
+indented output.
+
+Note that incremental parsing (GQLSchemaStream) always relies on the standard library, as other backends can't decode
+a value from the middle of a buffer.
+"""
+from __future__ import unicode_literals
+from builtins import str
+import json as _json
+import os
+from platform import python_implementation
+from gqlspection import log
+
+# Order of preference. ujson comes last, as it turned out to be slower than the standard library on introspection
+# results (see benchmarks/bench_json.py).
+BACKENDS = ('orjson', 'json', 'ujson')
+
+name = 'json'
+_loads = _json.loads
+_dumps = _json.dumps
+
+
+def _stdlib_loads(data):
+    if isinstance(data, bytes) and not isinstance(data, str):
+        data = data.decode('utf-8')
+    return _json.loads(data)
+
+
+def _stdlib_dumps(obj, indent=None):
+    return _json.dumps(obj, indent=indent, ensure_ascii=False, separators=(',', ':') if indent is None else (',', ': '))
+
+
+def _import(backend):
+    """Return (loads, dumps) functions of the backend, raise ImportError if it's not available."""
+    if backend == 'json':
+        return _stdlib_loads, _stdlib_dumps
+
+    if python_implementation() == 'Jython':
+        raise ImportError("Only the standard library JSON backend is available under Jython")
+
+    if backend == 'orjson':
+        import orjson
+
+        def dumps(obj, indent=None):
+            if indent not in (None, 2):
+                return _stdlib_dumps(obj, indent=indent)
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode('utf-8')
+
+        return orjson.loads, dumps
+
+    if backend == 'ujson':
+        import ujson
+        return ujson.loads, lambda obj, indent=None: ujson.dumps(obj, indent=indent or 0, ensure_ascii=False,
+                                                                 escape_forward_slashes=False)
+
+    raise ImportError("Unknown JSON backend: %s" % backend)
+
+
+def available():
+    """List the backends that can be used in the current environment."""
+    result = []
+    for backend in BACKENDS:
+        try:
+            _import(backend)
+        except ImportError:
+            continue
+        result.append(backend)
+    return result
+
+
+def select(backend=None):
+    """Switch to the provided backend, or to the fastest available one if it's not specified."""
+    global name, _loads, _dumps
+
+    for candidate in ([backend] if backend else BACKENDS):
+        try:
+            _loads, _dumps = _import(candidate)
+        except ImportError:
+            if backend:
+                raise
+            continue
+        name = candidate
+        return name
+
+
+def loads(data):
+    """Decode JSON document (bytes or string)."""
+    return _loads(data)
+
+
+def load(fp):
+    """Decode JSON document from a file-like object (opened either in binary or text mode)."""
+    return _loads(fp.read())
+
+
+def dumps(obj, indent=None):
+    """Encode an object as a JSON string."""
+    return _dumps(obj, indent=indent)
+
+
+def _select_from_environment():
+    """Switch to the backend from GQLSPECTION_JSON_BACKEND, or to the fastest available one if it can't be used."""
+    backend = os.environ.get('GQLSPECTION_JSON_BACKEND')
+    try:
+        return select(backend)
+    except ImportError as e:
+        log.warn("Can't use the JSON backend requested by GQLSPECTION_JSON_BACKEND (%s), selecting one automatically: %s",
+                 backend, e)
+        return select()
+
+
+_select_from_environment()
@@ -1,68 +1,47 @@
 # coding: utf-8
-# These functions are generated by ChatGPT (https://chat.openai.com/chat), Dec 15 [2022] Version.
+# format_comment() is generated by ChatGPT (https://chat.openai.com/chat), Dec 15 [2022] Version.
 # According to ChatGPT, the code is licensed under MIT license.
 
 from __future__ import unicode_literals
 from gqlspection import log
 from builtins import str
+import re
+
+
+# Strings & block strings (preserved verbatim) and comments (dropped), in the order of priority. Everything in between
+# is made of names, numbers, punctuators and insignificant characters (whitespace, commas and BOM).
+_STRINGS_AND_COMMENTS = re.compile(
+    r'("""(?:\\"""|[^"]|"(?!""))*"""'  # block string
+    r'|"(?:[^"\\\n\r]|\\.)*"'         # string
+    r'|#[^\n\r]*)'                   # comment
+)
+# spaces are only needed between names & numbers, so that they don't run together
+_SPACES = re.compile(r'(?<![_0-9A-Za-z]) | (?![_0-9A-Za-z])')
+
+
+def _collapse(text):
+    text = ' '.join(text.replace(',', ' ').replace('\ufeff', ' ').split())
+    return _SPACES.sub('', text)
 
 
 def minimize_query(query):
-    # Set up a buffer for the minimized query
-    minimized = ""
-
-    # Set up a flag to track whether we are inside a comment
-    in_comment = False
-
-    # Set up a flag to track whether we are inside a string
-    in_single_string = False
-    in_double_string = False
-    in_string = False
-
-    # Set up a flag to track whether we are inside a whitespace
-    in_space = False
-
-    # Set up a flag to track whether the current character is an escaped quote
-    escaped = False
-
-    # Iterate over each character in the query
-    for i, c in enumerate(query.strip()):
-        # If we see the start of a comment and we are not inside a string,
-        # set the in_comment flag
-        if c == "#" and not in_string:
-            in_comment = True
-
-        # Preserve strings verbatim
-        if in_string:
-            minimized += c
-        # Skip comments entirely
-        elif not in_comment:
-            # Collapse all whitespace into one space character
-            if in_space:
-                if not c.isspace():
-                    minimized += " " + c
-            elif not c.isspace():
-                minimized += c
-
-        # If we are inside a whitespace, set the in_space flag
-        in_space = c.isspace()
-
-        # If we see the end of a comment and we are not inside a string,
-        # clear the in_comment flag
-        if not in_string and (c == "\n"):
-            in_comment = False
-
-        # Toggle the in_*_string flags if we see quote character, unless it's escaped
-        if not in_comment and not escaped:
-            in_double_string = not in_double_string if c == '"' else in_double_string
-            in_single_string = not in_single_string if c == "'" else in_single_string
-        in_string = in_single_string or in_double_string
-
-        # Set the escaped flag, if the current character is a backslash
-        escaped = (c == "\\")
-
-    # Return the minimized query
-    return minimized
+    """Strip comments and insignificant characters from a GraphQL document, strings are preserved verbatim.
+
+    The document is split into strings, comments and the rest in a single pass and the rest gets collapsed with plain
+    string operations and a single regex, so the running time is linear.
+    """
+    parts = []
+    pending = []
+    for i, part in enumerate(_STRINGS_AND_COMMENTS.split(query)):
+        if i % 2 and part[0] == '"':
+            parts.append(_collapse(''.join(pending)))
+            parts.append(part)
+            pending = []
+        else:
+            # comments still separate tokens around them
+            pending.append(' ' if i % 2 else part)
+    parts.append(_collapse(''.join(pending)))
+    return ''.join(parts)
 
 
 def format_comment(string, max_length=60):
@@ -125,3 +104,21 @@ def pad_string(string, n=4):
     else:
         log.debug("Asked to pad the following non-string with %s spaces: %s", n, string)
         raise Exception("Expected a string to pad, received %s", type(string))
+
+
+def parallel_map(function, iterable, workers=4):
+    """Map in a pool of threads (results are in the order of 'iterable'), sequentially if threads aren't available."""
+    try:
+        from multiprocessing.pool import ThreadPool
+    except ImportError:
+        workers = 1
+
+    if workers <= 1:
+        return [function(item) for item in iterable]
+
+    pool = ThreadPool(workers)
+    try:
+        return pool.map(function, iterable)
+    finally:
+        pool.close()
+        pool.join()
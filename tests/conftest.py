@@ -0,0 +1,31 @@
+# coding: utf-8
+# noinspection PyUnresolvedReferences
+from __future__ import unicode_literals
+
+import sys
+
+try:
+    from pathlib import Path
+except ImportError:
+    from pathlib2 import Path
+
+import pytest
+
+from gqlspection import GQLSchema
+
+DATA = Path(__file__).parent / 'data'
+
+# the asyncio tests are written with 'async def', which older interpreters can't even parse
+collect_ignore = ['test_aio.py'] if sys.version_info < (3, 7) else []
+
+
+@pytest.fixture(autouse=True)
+def cache_home(tmpdir, monkeypatch):
+    """Keep the on-disk schema cache (enabled by default in the CLI) out of the user's real cache directory."""
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmpdir.join('cache')))
+    return tmpdir.join('cache')
+
+
+def load_schema(name='small_valid_cyclic', **kwargs):
+    """Load one of the schemas from tests/data (shared by the test modules, import it from conftest)."""
+    return GQLSchema(json=(DATA / "{}.json".format(name)).read_text(), **kwargs)
@@ -0,0 +1,117 @@
+# coding: utf-8
+# noinspection PyUnresolvedReferences
+from __future__ import unicode_literals
+
+import sys
+
+import pytest
+
+if sys.version_info < (3, 7):
+    pytest.skip("asyncio API requires Python 3.7+", allow_module_level=True)
+
+import asyncio  # noqa: E402
+import json  # noqa: E402
+import threading  # noqa: E402
+from pathlib import Path  # noqa: E402
+
+from click.testing import CliRunner  # noqa: E402
+
+from gqlspection import GQLSchema  # noqa: E402
+from gqlspection.aio import iter_schemas  # noqa: E402
+from gqlspection.cli import cli, endpoint_name  # noqa: E402
+
+DATA = Path(__file__).parent / 'data'
+
+
+class StubServer(object):
+    """Minimal asyncio HTTP server: '/slow*' paths respond after a delay, '/broken' with invalid JSON."""
+
+    def __init__(self):
+        self.payload = json.dumps({'data': json.loads((DATA / 'small_valid_cyclic.json').read_text())}).encode()
+        self.in_flight = self.max_in_flight = 0
+        self.loop = asyncio.new_event_loop()
+        self.started = threading.Event()
+
+    async def handle(self, reader, writer):
+        headers = await reader.readuntil(b'\r\n\r\n')
+        path = headers.split(b' ')[1].decode()
+        length = [int(line.split(b':')[1]) for line in headers.split(b'\r\n') if line.lower().startswith(b'content-length')]
+        await reader.readexactly(length[0])
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        if path.startswith('/slow'):
+            await asyncio.sleep(0.2)
+        self.in_flight -= 1
+
+        body = b'<html>' if path == '/broken' else self.payload
+        writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nConnection: close\r\n'
+                     b'Content-Length: %d\r\n\r\n%s' % (len(body), body))
+        await writer.drain()
+        writer.close()
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.server = self.loop.run_until_complete(asyncio.start_server(self.handle, '127.0.0.1', 0))
+        self.url = 'http://127.0.0.1:%d' % self.server.sockets[0].getsockname()[1]
+        self.started.set()
+        self.loop.run_forever()
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+@pytest.fixture
+def stub():
+    server = StubServer()
+    thread = threading.Thread(target=server.run)
+    thread.daemon = True
+    thread.start()
+    server.started.wait()
+    yield server
+    server.stop()
+    thread.join()
+
+
+def collect(urls, **kwargs):
+    async def main():
+        return [result async for result in iter_schemas(urls, **kwargs)]
+    return asyncio.run(main())
+
+
+def test_schemas_arrive_as_soon_as_ready(stub):
+    urls = [stub.url + '/slow', stub.url + '/fast', stub.url + '/broken']
+    results = collect(urls)
+
+    assert [url for url, _ in results][-1] == stub.url + '/slow'
+    assert isinstance(dict(results)[stub.url + '/broken'], Exception)
+
+    expected = [op.str() for op in GQLSchema(json=stub.payload.decode()).iter_operations()]
+    schemas = asyncio.run(GQLSchema.from_urls_async(urls[:2]))
+    assert list(schemas) == urls[:2]
+    for schema in schemas.values():
+        assert [op.str() for op in schema.iter_operations()] == expected
+
+
+@pytest.mark.parametrize("per_host", (1, 3))
+def test_per_host_limit(stub, per_host):
+    results = collect([stub.url + '/slow%d' % i for i in range(3)], per_host=per_host)
+
+    assert all(isinstance(schema, GQLSchema) for _, schema in results)
+    assert stub.max_in_flight == per_host
+
+
+def test_cli_url_list(stub, tmpdir):
+    url_list = tmpdir.join('urls.txt')
+    url_list.write('\n'.join(['# endpoints', stub.url + '/slow', stub.url + '/broken', '']))
+    output = tmpdir.join('out')
+
+    result = CliRunner().invoke(cli, ['-U', str(url_list), '-o', str(output), '-Q', '-d', '2'])
+    assert result.exit_code == 0, result.output
+
+    name = endpoint_name(stub.url + '/slow')
+    assert name.startswith(stub.url.split('://')[1].replace(':', '_') + '_slow_')
+    assert json.loads(output.join(name + '.json').read()) == json.loads(stub.payload.decode())
+    assert output.join(name + '.graphql').read().startswith('query {\n    posts {\n')
+    assert not output.join(endpoint_name(stub.url + '/broken') + '.json').check()
+    assert 'FAILED ' + stub.url + '/broken' in result.output
@@ -0,0 +1,38 @@
+# coding: utf-8
+# noinspection PyUnresolvedReferences
+from __future__ import unicode_literals
+
+from gqlspection import GQLBatcher
+from conftest import load_schema
+
+
+def test_root_fields_are_aliased():
+    schema = load_schema()
+    batches = list(GQLBatcher().batch(schema.iter_operations(max_depth=3)))
+
+    assert len(batches) == 1
+    batch = batches[0].selection()
+    assert [(node.alias, node.name) for node in batch.selections] == [('posts_0', 'posts'), ('user_1', 'user')]
+    assert batches[0].minimized().startswith('query{posts_0:posts{author{')
+    # same selections as the original operations, only aliased
+    originals = [operation.selection().selections[0] for operation in schema.iter_operations(max_depth=3)]
+    assert [node.selections for node in batch.selections] == [node.selections for node in originals]
+    assert batches[0].str().count('\nquery') == 0
+
+
+def test_batch_limits():
+    schema = load_schema()
+    operations = [schema.generate_query('user', max_depth=3) for _ in range(5)]
+
+    batches = list(GQLBatcher(batch_size=2).batch(operations))
+    assert [len(batch.selection().selections) for batch in batches] == [2, 2, 1]
+    assert [node.alias for node in batches[0].selection().selections] == ['user_0', 'user_1']
+
+    size = len(operations[0].str(0))
+    batches = list(GQLBatcher(batch_size=None, max_bytes=size * 3, pad=0).batch(operations))
+    assert all(len(batch.str(0)) <= size * 3 for batch in batches)
+    assert [len(batch.selection().selections) for batch in batches] == [2, 2, 1]
+
+    # operations larger than the limit get split first
+    batches = list(GQLBatcher(max_fields=6).batch(operations[:1]))
+    assert len(batches) > 1 and all(batch.selection().size - 1 <= 6 for batch in batches)
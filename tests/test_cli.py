@@ -0,0 +1,114 @@
+# coding: utf-8
+# noinspection PyUnresolvedReferences
+from __future__ import unicode_literals
+
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from gqlspection import GQLSchema
+from gqlspection.cli import cli, endpoint_name
+from conftest import DATA
+
+
+def invoke(*args):
+    result = CliRunner().invoke(cli, list(args))
+    assert result.exit_code == 0, result.output
+    return result.output
+
+
+def test_list_prototypes():
+    output = invoke('-f', str(DATA / 'small_valid_cyclic.json'), '-l', 'all')
+    assert output.splitlines() == ['query posts: [Post]', 'query user(id: ID!): User']
+
+
+def test_extract_root_types():
+    for path in DATA.glob('*.json'):
+        data = path.read_text()
+        roots = GQLSchema.extract_root_types(data)
+        schema, full = GQLSchema(json=roots, lazy=True), GQLSchema(json=data)
+
+        assert [repr(f) for f in schema.query.fields] == [repr(f) for f in full.query.fields]
+        if full.mutation:
+            assert [repr(f) for f in schema.mutation.fields] == [repr(f) for f in full.mutation.fields]
+        else:
+            assert schema.mutation is None
+
+
+def test_stats_and_profile(tmpdir):
+    import pstats
+
+    profile = str(tmpdir.join('run.prof'))
+    result = CliRunner().invoke(cli, ['-f', str(DATA / 'small_valid_cyclic.json'), '--no-cache', '--stats', 'json',
+                                      '--profile', profile])
+    assert result.exit_code == 0, result.output
+
+    # stats go to stderr, which may be interleaved with the output
+    stats, _ = json.JSONDecoder().raw_decode(result.output, result.output.index('{\n  "timings"'))
+    assert set(stats['timings']) == {'types', 'link', 'schema', 'render', 'total'}
+    assert stats['counters']['operations'] == 2
+    assert pstats.Stats(profile).total_calls > 0
+
+
+def test_cost_budget():
+    path = str(DATA / 'small_valid_cyclic.json')
+    full = invoke('-f', path, '-q', 'user')
+    pruned = invoke('-f', path, '-q', 'user', '--cost-budget', '50')
+
+    assert len(pruned) < len(full)
+    assert pruned.startswith('query {\n    user(id: ID!) {\n')
+
+
+def test_split_operations():
+    output = invoke('-f', str(DATA / 'small_valid_cyclic.json'), '-q', 'user', '--max-bytes', '600')
+    parts = output.split('\n}\n')
+    assert len(parts) > 1
+    assert all(part.startswith('query {\n    user(id: ID!) {\n') and len(part) + 2 <= 600 for part in parts[:-1])
+
+
+def test_batches():
+    path = str(DATA / 'small_valid_cyclic.json')
+    output = invoke('-f', path, '--batch-size', '10')
+    assert output.count('query {') == 1 and 'posts_0: posts {' in output and 'user_1: user(id: ID!) {' in output
+
+    output = invoke('-f', path, '--json-batches', '2')
+    assert [[request['query'][:11] for request in json.loads(line)] for line in output.splitlines()] == [
+        ['query{posts', 'query{user(']]
+
+
+def test_fragments_document_is_valid(tmpdir):
+    graphql = pytest.importorskip('graphql')
+    from graphql.validation import LoneAnonymousOperationRule, specified_rules
+
+    schema = graphql.build_schema('''
+        type Query { a: A  b: B  c: C }
+        type A { b: B  c: C  name: String }
+        type B { id: ID  title: String }
+        type C { b: B  tags: [String] }
+    ''')
+    path = tmpdir.join('schema.json')
+    path.write(json.dumps({'data': graphql.graphql_sync(schema, graphql.get_introspection_query()).data}))
+
+    output = invoke('-f', str(path), '-d', '10', '--fragments')
+    assert output.count('fragment BFields on B {') == 1
+    # operations are anonymous, otherwise the output is a single valid document
+    rules = [rule for rule in specified_rules if rule is not LoneAnonymousOperationRule]
+    assert graphql.validate(schema, graphql.parse(output), rules) == []
+
+
+def test_url_list_requires_python_3_7(tmpdir, monkeypatch):
+    url_list = tmpdir.join('urls.txt')
+    url_list.write('http://localhost/graphql\n')
+    monkeypatch.setattr('sys.version_info', (2, 7, 18))
+
+    result = CliRunner().invoke(cli, ['-U', str(url_list), '-o', str(tmpdir.join('out'))])
+    assert result.exit_code == 1
+    assert not tmpdir.join('out').check()
+
+
+def test_endpoint_names_are_unique():
+    urls = ['http://h/graphql', 'https://h/graphql', 'https://h/graph-ql', 'https://h/graphql?']
+    names = [endpoint_name(url) for url in urls]
+    assert len(set(names)) == len(urls)
+    assert all(name.startswith('h_graph') for name in names)
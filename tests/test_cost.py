@@ -0,0 +1,56 @@
+# coding: utf-8
+# noinspection PyUnresolvedReferences
+from __future__ import unicode_literals
+
+from gqlspection import GQLCost, GQLSelection
+from conftest import load_schema
+
+
+def test_estimate():
+    table = {}
+    name = GQLSelection.intern(table, 'name', type='String')
+    tags = GQLSelection.intern(table, 'tags', type='String', modifiers=('LIST',))
+    matrix = GQLSelection.intern(table, 'matrix', type='Cell', selections=(name,), modifiers=('LIST', 'NON_NULL', 'LIST'))
+    friends = GQLSelection.intern(table, 'friends', type='User', selections=(tags, matrix), modifiers=('LIST',))
+
+    # lists multiply the cost of their selection sets, nested lists multiply repeatedly
+    assert GQLCost().estimate(friends, 'User') == 1 + 10 * (1 + (1 + 100 * 1))
+    assert GQLCost(list_multiplier=2).estimate(friends, 'User') == 1 + 2 * (1 + (1 + 4 * 1))
+    assert GQLCost(list_multipliers={'User.friends': 3}).estimate(friends, 'User') == 1 + 3 * (1 + (1 + 100 * 1))
+    assert GQLCost(type_weights={'User': 5, 'String': 0}).estimate(friends, 'User') == 5 + 10 * (0 + (1 + 100 * 0))
+
+
+def test_every_operation_has_a_cost():
+    schema = load_schema()
+    costs = [operation.cost() for operation in schema.iter_operations(max_depth=3)]
+    assert len(costs) == 2 and all(cost > 0 for cost in costs)
+    # deeper operations select more nested lists
+    assert schema.generate_query('user', max_depth=5).cost() > schema.generate_query('user', max_depth=3).cost()
+
+
+def test_cost_budget():
+    schema = load_schema()
+    full = schema.generate_query('user', max_depth=5)
+
+    for budget in (5000, 500, 50, 5):
+        query = schema.generate_query('user', max_depth=5, cost_budget=budget)
+        assert query.cost() <= budget
+        assert query.cost() < full.cost()
+        result = query.str()
+        assert result.startswith('query {\n    user(id: ID!) {\n')
+        # selection sets are never left empty
+        assert '{\n}' not in result and '{}' not in query.minimized()
+
+    # the root field can't be removed
+    assert schema.generate_query('user', max_depth=5, cost_budget=0).minimized() == 'query{user(id:ID!){name}}'
+
+
+def test_cost_budget_is_used_up():
+    schema = load_schema()
+    full = schema.generate_query('user', max_depth=7)
+
+    for budget in (100000, 20000, 5000):
+        query = schema.generate_query('user', max_depth=7, cost_budget=budget)
+        # fields are removed one by one, not whole branches, so the cost ends up close to the budget
+        assert budget * 0.9 <= query.cost() <= budget < full.cost()
+        assert query.selection().size > 10
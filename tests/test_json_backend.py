@@ -0,0 +1,53 @@
+# coding: utf-8
+# noinspection PyUnresolvedReferences
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+
+import pytest
+
+from gqlspection import json_backend
+
+
+@pytest.fixture(params=json_backend.available())
+def backend(request):
+    selected = json_backend.name
+    json_backend.select(request.param)
+    yield request.param
+    json_backend.select(selected)
+
+
+def test_roundtrip(backend):
+    document = {'data': {'__schema': {'types': [{'name': 'Query', 'description': 'Zażółć'}], 'count': 1}}}
+    encoded = json_backend.dumps(document)
+
+    assert json_backend.loads(encoded) == document
+    assert json_backend.loads(encoded.encode('utf-8')) == document
+    assert json_backend.loads(json_backend.dumps(document, indent=2)) == document
+
+
+def test_output_is_the_same_for_all_backends(backend):
+    document = OrderedDict([('url', 'https://example.com/graphql'),
+                            ('types', [OrderedDict([('name', 'Zażółć'), ('kind', None)])])])
+    assert json_backend.dumps(document) == '{"url":"https://example.com/graphql","types":[{"name":"Zażółć","kind":null}]}'
+    assert json_backend.dumps(document['types'], indent=2) == '[\n  {\n    "name": "Zażółć",\n    "kind": null\n  }\n]'
+
+
+def test_stdlib_is_always_available():
+    assert 'json' in json_backend.available()
+    assert json_backend.name in json_backend.available()
+
+
+def test_unknown_backend():
+    with pytest.raises(ImportError):
+        json_backend.select('nonexistent')
+
+
+def test_unknown_backend_in_environment(monkeypatch):
+    selected = json_backend.name
+    monkeypatch.setenv('GQLSPECTION_JSON_BACKEND', 'nonexistent')
+    try:
+        # importing the module must not fail, the fastest available backend gets used instead
+        assert json_backend._select_from_environment() == json_backend.available()[0]
+    finally:
+        json_backend.select(selected)
@@ -0,0 +1,55 @@
+# coding: utf-8
+# noinspection PyUnresolvedReferences
+from __future__ import unicode_literals
+
+from gqlspection import GQLEnum, GQLList
+
+
+def make_list(*names):
+    return GQLList(GQLEnum(name) for name in names)
+
+
+def test_access_by_index_and_name():
+    gqllist = make_list('b', 'c', 'a')
+
+    assert [el.name for el in gqllist] == ['a', 'b', 'c']
+    assert gqllist[0].name == 'a'
+    assert gqllist[-1].name == 'c'
+    assert gqllist['b'] is gqllist[1]
+    assert len(gqllist) == 3
+
+
+def test_membership():
+    gqllist = make_list('a', 'b')
+    other = GQLEnum('a')
+
+    assert 'a' in gqllist
+    assert 'z' not in gqllist
+    assert gqllist['a'] in gqllist
+    assert other not in gqllist
+    assert object() not in gqllist
+
+
+def test_duplicate_names():
+    first, second = GQLEnum('a', 'first'), GQLEnum('a', 'second')
+    gqllist = GQLList([first, second])
+
+    assert len(gqllist) == 1
+    assert gqllist['a'] is second
+
+
+def test_prefix_lookup():
+    gqllist = make_list('user', 'users', 'userById', 'post', 'u')
+
+    assert [el.name for el in gqllist.with_prefix('user')] == ['user', 'userById', 'users']
+    assert [el.name for el in gqllist.with_prefix('p')] == ['post']
+    assert gqllist.with_prefix('x') == ()
+    assert len(gqllist.with_prefix('')) == 5
+
+
+def test_empty_list():
+    gqllist = make_list()
+
+    assert not gqllist
+    assert 'a' not in gqllist
+    assert repr(gqllist) == 'GQLList[]'
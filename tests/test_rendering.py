@@ -0,0 +1,164 @@
+# coding: utf-8
+# noinspection PyUnresolvedReferences
+from __future__ import unicode_literals
+
+import io
+import pytest
+
+from gqlspection import GQLFragments, GQLQuery, GQLSchema, GQLSelection, GQLWriter
+from conftest import DATA, load_schema
+
+
+def render_queries(schema, pad):
+    return '\n'.join(schema.generate_query(field).str(pad) for field in schema.query.fields)
+
+
+@pytest.mark.parametrize("pad,suffix", ((0, 'pad0'), (None, 'padNone'), (2, 'pad2')))
+def test_pad_modes(pad, suffix):
+    expected = (DATA / "small_valid_cyclic.queries.{}.txt".format(suffix)).read_text()
+    assert render_queries(load_schema(), pad).strip() == expected.strip()
+
+
+def test_render_cache_is_reused():
+    schema = load_schema()
+    first = render_queries(schema, 4)
+    misses = schema.render_cache.misses
+    assert schema.render_cache.hits > 0
+
+    # rendering the same thing once again should be served from the cache
+    assert render_queries(schema, 4) == first
+    assert schema.render_cache.misses == misses
+
+
+def test_render_cache_eviction():
+    schema = load_schema(render_cache_size=2)
+    uncached = load_schema(render_cache_size=0)
+
+    assert render_queries(schema, 4) == render_queries(uncached, 4)
+    assert len(schema.render_cache) <= 2
+    assert schema.render_cache.evictions > 0
+    assert len(uncached.render_cache) == 0
+
+
+def test_writer_sink():
+    schema = load_schema()
+    query = schema.generate_query('user')
+
+    sink = io.StringIO()
+    query.write(GQLWriter(pad=4, sink=sink))
+    assert sink.getvalue() == query.str(pad=4)
+
+
+def test_iter_operations_streaming():
+    schema = load_schema()
+    streamed = '\n'.join(''.join(operation.iter_lines(4)) for operation in schema.iter_operations())
+    assert streamed == render_queries(schema, 4)
+
+
+def test_deep_max_depth():
+    # a single self-referencing field, so that output grows linearly with depth
+    schema = GQLSchema(json={'__schema': {
+        'queryType': {'name': 'Query'},
+        'types': [
+            {'name': 'Query', 'kind': 'OBJECT', 'fields': [{'name': 'node', 'type': {'name': 'Node', 'kind': 'OBJECT'}}]},
+            {'name': 'Node',  'kind': 'OBJECT', 'fields': [{'name': 'next', 'type': {'name': 'Node', 'kind': 'OBJECT'}}]}
+        ]
+    }})
+
+    # deeper than the interpreter recursion limit, nested selections are walked without recursion
+    lines = list(schema.generate_query('node', max_depth=5000).iter_lines(pad=4))
+    assert len(lines) > 2 * 5000
+    assert lines[-2:] == ['    }\n', '}']
+
+
+def test_cycles_are_not_followed():
+    schema = load_schema()
+    result = schema.generate_query('user', max_reentries=0).str()
+
+    assert 'friends' not in result
+    assert 'author' not in result
+    assert 'MAX RECURSION DEPTH' not in result
+
+
+def test_node_budget():
+    schema = load_schema()
+    for budget in (2, 5, 20):
+        query = schema.generate_query('user', node_budget=budget, max_depth=50)
+        result = query.str()
+        # root field + selected fields, including __typename of fully pruned selection sets
+        selected = [line for line in result.splitlines()[1:-1] if line.strip() not in ('}', GQLSelection.MAX_DEPTH_MARKER)]
+        assert len(selected) == query.selection().size - 1 <= budget
+        assert result.count('{') == result.count('}')
+
+    # fields of the whole operation share the budget, the first one (with a nested field) is always selected
+    operation = GQLQuery(schema.query, node_budget=3, max_depth=50)
+    assert operation.minimized() == 'query{posts{author{name}}}'
+    assert GQLQuery(schema.query, node_budget=1).minimized() == 'query{posts{__typename}}'
+    assert GQLQuery(schema.query, node_budget=100, max_depth=50).selection().size - 1 == 100
+
+
+def test_generation_is_bounded_on_cycles():
+    schema = load_schema()
+    shallow = schema.generate_query('user', max_depth=8, max_reentries=1).str()
+    deep = schema.generate_query('user', max_depth=100, max_reentries=1).str()
+    assert shallow == deep
+
+
+def test_fragments():
+    schema = load_schema()
+    result = schema.generate_query('user', max_depth=4, fragments=True).str()
+
+    assert result.splitlines()[:5] == [
+        'query {', '    user(id: ID!) {', '        friends(first: Int) {', '            ...UserFields', '        }']
+    assert result.count('fragment UserFields on User {') == 1
+    # every distinct selection set is defined once
+    definitions = [line for line in result.splitlines() if line.startswith('fragment ')]
+    assert len(definitions) == len(set(definitions)) == 6
+    for name in set(line.split()[1] for line in definitions):
+        assert '...' + name in result
+    assert result.count('{') == result.count('}')
+
+
+def test_fragments_with_path_limits():
+    schema = load_schema()
+    query = schema.generate_query('user', max_depth=8, max_reentries=1, fragments=True)
+    result = query.str()
+
+    definitions = [line for line in result.splitlines() if line.startswith('fragment ')]
+    assert len(definitions) == len(set(definitions))
+    assert result.count('{') == result.count('}')
+    assert 'fragment UserFields on User {' in definitions
+    # fragments only change the serialisation, not what gets selected
+    assert query.selection() is schema.generate_query('user', max_depth=8, max_reentries=1).selection()
+
+
+def test_fragments_are_shared_between_operations():
+    schema = load_schema()
+    writer = GQLWriter(pad=None)
+    fragments = GQLFragments()
+    for operation in schema.iter_operations(max_depth=4, fragments=fragments):
+        operation.write(writer)
+        # shared fragments are only spread by the operations
+        assert 'fragment' not in writer.getvalue()
+    fragments.write(writer)
+    document = writer.getvalue()
+
+    assert document.count('fragment UserFields on User{') == 1
+    assert document.startswith('query{posts{author{...UserFields}')
+    assert document.index('fragment UserFields') > document.rindex('query{')
+
+
+def test_fragments_of_acyclic_types_ignore_depth():
+    def object_type(name, **fields):
+        return {'name': name, 'kind': 'OBJECT', 'fields': [
+            {'name': field, 'type': {'name': kind, 'kind': 'SCALAR' if kind == 'ID' else 'OBJECT'}}
+            for field, kind in sorted(fields.items())]}
+
+    schema = GQLSchema(json={'__schema': {'queryType': {'name': 'Query'}, 'types': [
+        object_type('Query', a='A'), object_type('A', b='B', c='C'), object_type('C', b='B'), object_type('B', id='ID')]}})
+
+    result = schema.generate_query('a', max_depth=10, fragments=True).str()
+    # B is reached at different depths (through A and through C), but it's selected the same way
+    assert result.count('...BFields\n') == 2
+    assert 'BFields2' not in result
+    assert 'MAX RECURSION DEPTH' not in result
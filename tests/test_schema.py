@@ -0,0 +1,220 @@
+# coding: utf-8
+# noinspection PyUnresolvedReferences
+from __future__ import unicode_literals
+
+import threading
+
+import pytest
+
+from gqlspection import GQLLazyTypes, GQLSchema, GQLSchemaCache, GQLSchemaStream, GQLSelection, GQLStats, GQLType
+from conftest import DATA, load_schema
+
+
+def test_type_references_are_linked():
+    schema = load_schema()
+
+    assert type(schema.query) is GQLType
+    for gqltype in schema.types:
+        for field in gqltype.fields:
+            assert type(field.type) is GQLType
+            assert field.type is schema.types[field.kind.name]
+            for arg in field.args:
+                assert type(arg.type) is GQLType
+
+
+def test_dangling_references_are_reported_at_once():
+    with pytest.raises(Exception) as e:
+        GQLSchema(json={'__schema': {
+            'queryType': {'name': 'Query'},
+            'types': [{'name': 'Query', 'kind': 'OBJECT', 'fields': [
+                {'name': 'one', 'type': {'name': 'Missing', 'kind': 'OBJECT'}},
+                {'name': 'two', 'type': {'name': 'Int', 'kind': 'SCALAR'},
+                 'args': [{'name': 'arg', 'type': {'name': 'MissingInput', 'kind': 'INPUT_OBJECT'}}]}
+            ]}]
+        }})
+
+    message = str(e.value)
+    assert 'Query.one: Missing' in message
+    assert 'Query.two(arg): MissingInput' in message
+
+
+def test_type_references_are_interned():
+    schema = load_schema()
+    user, post = schema.types['User'], schema.types['Post']
+
+    # User.name and Post.title are both nullable Strings
+    assert user.fields['name'].kind is post.fields['title'].kind
+    # Query.posts and User.posts are both [Post]
+    assert schema.query.fields['posts'].kind is user.fields['posts'].kind
+    assert user.fields['friends'].kind is not user.fields['posts'].kind
+    assert len(schema._proxies) == len(set(schema._proxies.values()))
+
+
+def test_lazy_types_are_built_on_demand():
+    schema = load_schema(lazy=True)
+    assert schema.types.materialised == 0
+
+    query = schema.generate_query('posts').str()
+    assert query == load_schema().generate_query('posts').str()
+    # Query, Post, User & String (argument types are not needed for rendering)
+    assert schema.types.materialised == 4
+    assert len(schema.types) == 8
+    assert 'Boolean' in schema.types
+
+
+def test_lazy_schema_renders_the_same():
+    for path in DATA.glob('*.json'):
+        eager, lazy = load_schema(path.stem), load_schema(path.stem, lazy=True)
+        assert [op.str() for op in lazy.iter_operations()] == [op.str() for op in eager.iter_operations()]
+        assert [t.name for t in lazy.types] == [t.name for t in eager.types]
+
+
+def test_streamed_schema_renders_the_same():
+    for path in DATA.glob('*.json'):
+        with path.open('rb') as stream:
+            streamed = GQLSchema(stream=stream)
+        full = load_schema(path.stem)
+        assert [op.str() for op in streamed.iter_operations()] == [op.str() for op in full.iter_operations()]
+
+
+@pytest.mark.parametrize("chunk_size", (1, 2, 7, 64 * 1024))
+def test_stream_chunk_boundaries(chunk_size):
+    import io
+    import json
+
+    data = (DATA / 'small_valid_cyclic.json').read_text()
+    expected = json.loads(data)['__schema']
+
+    for stream in (io.StringIO(data), io.BytesIO(data.encode('utf-8'))):
+        reader = GQLSchemaStream(stream, chunk_size=chunk_size)
+        assert list(reader.iter_types()) == expected['types']
+        assert reader.schema == {'queryType': expected['queryType']}
+
+
+def test_stream_wrapped_in_data():
+    import io
+    import json
+
+    stream = io.BytesIO(json.dumps({'data': {'__schema': {
+        'types': [{'name': 'Query', 'kind': 'OBJECT', 'fields': [{'name': 'id', 'type': {'name': 'ID', 'kind': 'SCALAR'}}]}],
+        'queryType': {'name': 'Query'},
+        'mutationType': None
+    }}, 'extensions': {'cost': 1.5}}).encode('utf-8'))
+
+    schema = GQLSchema(stream=stream)
+    assert schema.generate_query('id').str() == 'query {\n    id\n}'
+    assert schema.mutation is None
+
+
+def test_cached_schema_renders_the_same(tmpdir):
+    cache = GQLSchemaCache(directory=str(tmpdir))
+
+    for path in DATA.glob('*.json'):
+        data = path.read_text()
+        key = cache.key(data)
+
+        parsed = GQLSchema(json=data, cache=cache)
+        assert tmpdir.join(key + GQLSchemaCache.SUFFIX).check()
+
+        cached = GQLSchema(json=data, cache=cache)
+        assert [op.str() for op in cached.iter_operations()] == [op.str() for op in parsed.iter_operations()]
+        assert [repr(t) for t in cached.types] == [repr(t) for t in parsed.types]
+
+        # file objects share the key with the same content
+        with path.open('rb') as stream:
+            assert cache.key(stream) == key
+            assert stream.tell() == 0
+
+
+def test_schema_cache_eviction_and_corruption(tmpdir):
+    data = (DATA / 'small_valid_cyclic.json').read_text()
+    cache = GQLSchemaCache(directory=str(tmpdir), max_size=0)
+
+    GQLSchema(json=data, cache=cache)
+    assert not tmpdir.listdir()
+
+    cache.max_size = 1024 * 1024
+    entry = tmpdir.join(cache.key(data) + GQLSchemaCache.SUFFIX)
+    expected = load_schema().generate_query('posts').str()
+    # not JSON at all, then valid JSON of the wrong shape (kinds are fine, types aren't)
+    for content in (b'garbage', b'[[["Post", "OBJECT", []]], [["Post", 7]], "Query", null]'):
+        entry.write_binary(content)
+        schema = GQLSchema(json=data, cache=cache)
+        assert schema.generate_query('posts').str() == expected
+        assert len(tmpdir.listdir()) == 1 and entry.read_binary() != content
+
+
+def test_cache_entries_that_cant_be_touched_are_a_miss(tmpdir, monkeypatch):
+    data = (DATA / 'small_valid_cyclic.json').read_text()
+    cache = GQLSchemaCache(directory=str(tmpdir))
+    GQLSchema(json=data, cache=cache)
+
+    def utime(path, times):
+        raise OSError("Read-only file system")
+
+    monkeypatch.setattr('os.utime', utime)
+    schema = GQLSchema(json=data, cache=cache)
+    assert schema.generate_query('posts').str() == load_schema().generate_query('posts').str()
+
+
+def test_unwritable_cache_doesnt_fail_the_load(tmpdir):
+    data = (DATA / 'small_valid_cyclic.json').read_text()
+    tmpdir.join('file').write('')
+    cache = GQLSchemaCache(directory=str(tmpdir.join('file', 'cache')))
+
+    schema = GQLSchema(json=data, cache=cache)
+    assert schema.generate_query('posts').str() == load_schema().generate_query('posts').str()
+
+
+def test_lazy_schema_with_cache(tmpdir):
+    data = (DATA / 'small_valid_cyclic.json').read_text()
+    cache = GQLSchemaCache(directory=str(tmpdir))
+
+    schema = GQLSchema(json=data, cache=cache, lazy=True)
+    assert isinstance(schema.types, GQLLazyTypes)
+    assert not tmpdir.listdir()
+
+    # cached schemas are complete, so they're used even if lazy loading is requested
+    GQLSchema(json=data, cache=cache)
+    cached = GQLSchema(json=data, cache=cache, lazy=True)
+    assert cached.generate_query('posts').str() == schema.generate_query('posts').str()
+
+
+def test_stats_hook():
+    phases = []
+    schema = load_schema(stats=lambda phase, seconds, stats: phases.append(phase))
+    assert phases == ['types', 'link', 'schema']
+    assert GQLStats.active() is None
+
+    output = ''.join(op.str() for op in schema.iter_operations())
+    counters = schema.stats.counters
+    assert phases[3:] == ['render', 'render']
+    assert (counters['types'], counters['fields'], counters['operations']) == (8, 7, 2)
+    assert counters['output bytes'] == len(output)
+    # fields only, operation headers and depth markers aren't nodes
+    fields = [line for line in output.splitlines() if line.strip() not in ('}', '', GQLSelection.MAX_DEPTH_MARKER)]
+    assert counters['rendered nodes'] == len(fields) - 2
+
+    # disabled by default
+    assert load_schema().stats is None
+
+
+def test_stats_are_per_thread():
+    collectors = [GQLStats(), GQLStats()]
+    activated = [threading.Event(), threading.Event()]
+
+    def collect(index):
+        with collectors[index]:
+            activated[index].set()
+            # both collectors are active at the same time, each in its own thread
+            activated[1 - index].wait(5)
+            load_schema()
+
+    threads = [threading.Thread(target=collect, args=(index,)) for index in (0, 1)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [stats.counters['types'] for stats in collectors] == [8, 8]
+    assert GQLStats.active() is None
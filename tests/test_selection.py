@@ -0,0 +1,79 @@
+# coding: utf-8
+# noinspection PyUnresolvedReferences
+from __future__ import unicode_literals
+
+import gc
+
+from gqlspection import GQLSelection
+from conftest import load_schema
+
+
+def test_identical_subtrees_are_shared():
+    schema = load_schema()
+    first = schema.generate_query('user', max_depth=6).selection()
+    second = schema.generate_query('user', max_depth=6).selection()
+    assert first is second
+
+    user = first.selections[0]
+    posts = [node for node in user.selections if node.name == 'posts'][0]
+    author = [node for node in posts.selections if node.name == 'author'][0]
+    friends = [node for node in author.selections if node.name == 'friends'][0]
+    # the same type at the same remaining depth is the very same object, wherever it's reached from
+    deeper = schema.generate_query('user', max_depth=4).selection().selections[0]
+    assert friends.selections == deeper.selections[0].selections
+    assert user.size == 1 + sum(node.size for node in user.selections)
+
+
+def test_intern():
+    table = {}
+    leaf = GQLSelection.intern(table, 'id')
+    node = GQLSelection.intern(table, 'user', ('id: ID!',), 'User', (leaf,))
+    assert GQLSelection.intern(table, 'user', ('id: ID!',), 'User', (GQLSelection.intern(table, 'id'),)) is node
+    assert GQLSelection.intern(table, 'user', ('id: ID!',), 'User', (leaf,), truncated=True) is not node
+    assert (node.header(), node.header('')) == ('user(id: ID!) {', 'user(id: ID!){')
+    assert node.size == 2
+
+
+def test_minimized():
+    schema = load_schema()
+    query = schema.generate_query('posts', max_depth=3)
+    minimized = query.minimized()
+
+    assert minimized.startswith('query{posts{author{')
+    # space only separates names
+    assert 'name posts{' in minimized and minimized.count(' ') == 1
+    assert GQLSelection.MAX_DEPTH_MARKER not in minimized
+    # selection sets cut off by the depth limit are still valid
+    assert '{}' not in minimized and '{__typename}' in minimized
+    assert minimized.count('{') == minimized.count('}')
+
+
+def test_json():
+    schema = load_schema()
+    tree = schema.generate_query('user', max_depth=2).json()
+
+    assert tree['name'] == 'query'
+    user = tree['selections'][0]
+    assert (user['name'], user['arguments'], user['type']) == ('user', ['id: ID!'], 'User')
+    assert [node['name'] for node in user['selections']] == ['friends', 'name', 'posts']
+    assert user['selections'][0] == {'name': 'friends', 'arguments': ['first: Int'], 'type': 'User', 'selections': [],
+                                     'truncated': True}
+    assert 'selections' not in user['selections'][1]
+
+
+def test_unused_nodes_are_released():
+    schema = load_schema(render_cache_size=0)
+    kept = schema.generate_query('user', max_depth=6).selection()
+    for operation in schema.iter_operations(max_depth=6):
+        operation.str()
+    gc.collect()
+    # only the nodes of the operation that's still referenced are left in the intern table
+    assert len(schema._selections) == len(set(iter_subtree(kept)))
+    assert schema.generate_query('user', max_depth=6).selection() is kept
+
+
+def iter_subtree(node):
+    yield node
+    for child in node.selections or ():
+        for descendant in iter_subtree(child):
+            yield descendant
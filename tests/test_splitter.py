@@ -0,0 +1,47 @@
+# coding: utf-8
+# noinspection PyUnresolvedReferences
+from __future__ import unicode_literals
+
+import pytest
+
+from gqlspection import GQLSplitter
+from conftest import load_schema
+
+
+def leaf_paths(node, path=()):
+    """All paths from the root to leaves (and truncated selection sets) of the selection tree."""
+    path = path + ((node.name, node.arguments),)
+    if not node.selections:
+        return {path}
+    return set().union(*(leaf_paths(child, path) for child in node.selections))
+
+
+@pytest.mark.parametrize("pad", (4, 0, None))
+def test_split_by_bytes(pad):
+    schema = load_schema()
+    query = schema.generate_query('user', max_depth=5)
+    full = query.str(pad)
+
+    assert [part.str(pad) for part in query.split(max_bytes=len(full), pad=pad)] == [full]
+    for limit in (len(full) // 2, len(full) // 4):
+        parts = query.split(max_bytes=limit, pad=pad)
+        assert all(len(part.str(pad)) <= limit for part in parts)
+        assert 1 < len(parts) < 10
+        # every part keeps the path from the root, together they select everything
+        assert all(part.str(pad).startswith(full[:len('query {\n    user(id: ID!)')]) for part in parts if pad)
+        assert set().union(*(leaf_paths(part.selection()) for part in parts)) == leaf_paths(query.selection())
+
+
+def test_split_by_fields():
+    schema = load_schema()
+    query = schema.generate_query('user', max_depth=5)
+
+    parts = query.split(max_fields=10)
+    assert [part.selection().size - 1 for part in parts] == [10, 10, 8, 10]
+    assert set().union(*(leaf_paths(part.selection()) for part in parts)) == leaf_paths(query.selection())
+
+    # paths deeper than the limit can't be split any further
+    assert max(part.selection().size - 1 for part in query.split(max_fields=1)) == 5
+
+    with pytest.raises(Exception):
+        GQLSplitter()
@@ -0,0 +1,240 @@
+# coding: utf-8
+# noinspection PyUnresolvedReferences
+from __future__ import unicode_literals
+
+try:
+    from pathlib import Path
+except ImportError:
+    from pathlib2 import Path
+
+import gzip
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+import pytest
+
+from gqlspection import GQLSchema, GQLStats, GQLTransport, GQLTypeRefTruncated
+from gqlspection.introspection_query import get_introspection_query
+
+DATA = Path(__file__).parent / 'data'
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])).decode('utf-8'))
+        # header names are recorded in lower case, as Python 2 does
+        server.requests.append((self.client_address, dict((k.lower(), v) for k, v in self.headers.items()), body))
+
+        if server.responses:
+            status, payload = server.responses.pop(0)
+        else:
+            status, payload = 200, server.payload(body) if callable(server.payload) else server.payload
+        data = json.dumps(payload).encode('utf-8')
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            buffer = io.BytesIO()
+            with gzip.GzipFile(fileobj=buffer, mode='wb') as f:
+                f.write(data)
+            data = buffer.getvalue()
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+@pytest.fixture
+def server():
+    server = Server(('127.0.0.1', 0), Handler)
+    server.requests = []
+    server.responses = []
+    server.payload = {'data': json.loads((DATA / 'small_valid_cyclic.json').read_text())}
+    server.url = 'http://127.0.0.1:%d/graphql' % server.server_address[1]
+
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_compressed_response_is_parsed(server):
+    transport = GQLTransport(backoff=0)
+    try:
+        schema = GQLSchema(url=server.url, transport=transport, extra_headers={'X-Test': 'yes'})
+        result = GQLSchema.send_request(server.url, transport=transport)
+    finally:
+        transport.close()
+
+    expected = GQLSchema(json=server.payload)
+    assert [op.str() for op in schema.iter_operations()] == [op.str() for op in expected.iter_operations()]
+    assert result == server.payload
+
+    (first, headers, body), (second, _, _) = server.requests
+    assert 'gzip' in headers['accept-encoding']
+    assert headers['x-test'] == 'yes'
+    assert '__schema' in body['query']
+    # the connection is kept open and reused
+    assert first == second
+
+
+def test_failed_requests_are_retried(server):
+    transport = GQLTransport(backoff=0, retries=2)
+    server.responses = [(503, {}), (429, {})]
+    try:
+        with GQLStats() as stats:
+            assert GQLSchema.send_request(server.url, transport=transport) == server.payload
+        assert len(server.requests) == 3
+        assert stats.counters['requests'] == 3
+        assert stats.counters['response bytes'] == len(json.dumps(server.payload))
+        assert set(stats.timings) == {'http', 'json', 'introspection'}
+
+        server.responses = [(502, {})] * 3
+        with pytest.raises(Exception) as e:
+            GQLSchema.send_request(server.url, transport=transport)
+        assert 'HTTP 502 after 3 attempts' in str(e.value)
+    finally:
+        transport.close()
+
+
+def test_retry_delay():
+    class Response(object):
+        def __init__(self, retry_after):
+            self.headers = {'Retry-After': retry_after}
+
+    transport = GQLTransport(backoff=1, max_delay=30)
+    assert transport._delay(0, Response('7')) == 7
+    # servers can't make the client wait for longer than max_delay
+    assert transport._delay(0, Response('86400')) == 30
+    # HTTP dates and garbage fall back to the exponential backoff
+    for retry_after in ('Wed, 21 Oct 2026 07:28:00 GMT', 'soon', ''):
+        assert 2 <= transport._delay(2, Response(retry_after)) <= 6
+    assert transport._delay(10) == 30
+
+
+def test_graphql_errors_are_reported(server):
+    transport = GQLTransport(backoff=0)
+    server.payload = {'errors': [{'message': 'introspection is disabled'}]}
+    try:
+        for load in (lambda: GQLSchema(url=server.url, transport=transport),
+                     lambda: GQLSchema.send_request(server.url, transport=transport)):
+            with pytest.raises(Exception) as e:
+                load()
+            assert 'introspection is disabled' in str(e.value)
+    finally:
+        transport.close()
+
+
+def nested_schema(query):
+    """Introspection result with a [[[[Int!]!]!]!]! field, type references are truncated according to the query."""
+    depth = query.split('fragment TypeRef')[1].count('ofType')
+
+    def type_ref(modifiers, level=0):
+        ref = {'kind': modifiers[0], 'name': 'Int' if modifiers[0] == 'SCALAR' else None}
+        if level < depth:
+            ref['ofType'] = type_ref(modifiers[1:], level + 1) if len(modifiers) > 1 else None
+        return ref
+
+    return {'data': {'__schema': {'queryType': {'name': 'Query'}, 'types': [
+        {'name': 'Query', 'kind': 'OBJECT', 'fields': [{'name': 'numbers', 'args': [], 'type': type_ref(
+            ['NON_NULL', 'LIST'] * 4 + ['NON_NULL', 'SCALAR'])}]}
+    ]}}}
+
+
+def test_introspection_query_builder():
+    query = get_introspection_query()
+    assert get_introspection_query() is query
+    assert query.split('fragment TypeRef')[1].count('ofType') == 7
+    assert 'description' in query and 'specifiedByURL' in query and 'directives' not in query
+
+    query = get_introspection_query(depth=3, descriptions=False, deprecated=False, specified_by_url=False,
+                                    directives=True)
+    assert query.split('fragment TypeRef')[1].count('ofType') == 3
+    for absent in ('description', 'includeDeprecated', 'isDeprecated', 'specifiedByURL'):
+        assert absent not in query
+    assert 'directives{name locations args{...InputValue}}' in query
+    assert query.count('{') == query.count('}')
+
+
+def test_truncated_type_refs_are_retried(server):
+    transport = GQLTransport(backoff=0)
+    server.payload = lambda body: nested_schema(body['query'])
+    try:
+        schema = GQLSchema(url=server.url, transport=transport, introspection={'descriptions': False})
+        assert repr(schema.query.fields['numbers'].kind) == '[[[[Int!]!]!]!]!'
+        assert len(server.requests) == 2
+        assert 'description' not in server.requests[-1][2]['query']
+
+        result = GQLSchema.send_request(server.url, transport=transport, depth=4)
+        assert repr(GQLSchema(json=result).query.fields['numbers'].kind) == '[[[[Int!]!]!]!]!'
+        assert len(server.requests) == 5
+
+        with pytest.raises(GQLTypeRefTruncated):
+            GQLSchema(url=server.url, transport=transport, introspection={'adaptive': False})
+    finally:
+        transport.close()
+
+
+def test_chunked_introspection(server):
+    import re
+
+    schema = json.loads((DATA / 'small_valid_cyclic.json').read_text())['__schema']
+    types = dict((t['name'], t) for t in schema['types'])
+
+    def respond(body):
+        requested = re.findall(r'(t\d+):\s*__type\(name:\s*"(\w+)"\)', body['query'])
+        if requested:
+            return {'data': dict((alias, types[name]) for alias, name in requested)}
+        return {'data': {'__schema': {
+            'queryType': schema['queryType'],
+            'mutationType': None,
+            'types': [{'name': t['name'], 'kind': t['kind']} for t in schema['types']]
+        }}}
+
+    transport = GQLTransport(backoff=0)
+    server.payload = respond
+    try:
+        chunked = GQLSchema(url=server.url, transport=transport, introspection={'chunk_size': 2, 'parallel': 2})
+    finally:
+        transport.close()
+
+    expected = GQLSchema(json={'__schema': schema})
+    assert [op.str() for op in chunked.iter_operations()] == [op.str() for op in expected.iter_operations()]
+    assert [t.name for t in chunked.types] == [t.name for t in expected.types]
+
+    names = [t['name'] for t in schema['types'] if not t['name'].startswith('__')]
+    assert len(server.requests) == 1 + (len(names) + 1) // 2
+    assert 'types{name kind}' in server.requests[0][2]['query']
+
+
+def test_batched_requests(server):
+    transport = GQLTransport(backoff=0)
+    server.payload = lambda body: [{'data': {'query': item['query']}} for item in body] if isinstance(body, list) else {}
+    try:
+        queries = ['query{a:__typename}', 'query{b:__typename}']
+        assert transport.post_batch(server.url, queries) == [{'data': {'query': query}} for query in queries]
+        assert len(server.requests) == 1
+        assert server.requests[0][2] == [{'query': query} for query in queries]
+
+        # servers without support for batching respond with a single object
+        server.payload = {'errors': [{'message': 'Must provide query string.'}]}
+        with pytest.raises(Exception) as e:
+            transport.post_batch(server.url, queries)
+        assert "doesn't support batched requests" in str(e.value)
+    finally:
+        transport.close()
@@ -0,0 +1,35 @@
+# coding: utf-8
+# noinspection PyUnresolvedReferences
+from __future__ import unicode_literals
+
+from gqlspection.utils import minimize_query
+
+
+def test_minimize_query():
+    query = '''
+    # leading comment
+    query Search($term: String = "a # b, c", $ids: [ID!] = [1, -2, 3.5e+3]) {
+        search(term: $term, ids: $ids) {   # trailing comment
+            ... on User { id name }
+            ...Fields
+        }
+    }
+    '''
+    assert minimize_query(query) == \
+        'query Search($term:String="a # b, c"$ids:[ID!]=[1-2 3.5e+3]){search(term:$term ids:$ids){...on User{id name}' \
+        '...Fields}}'
+
+
+def test_minimize_query_preserves_strings():
+    assert minimize_query('f(a: "x \\" # y", b: """ block \\""" "q" # z\n  """)') == \
+        'f(a:"x \\" # y"b:""" block \\""" "q" # z\n  """)'
+    assert minimize_query('﻿{ a,,, b }') == '{a b}'
+    assert minimize_query('{ a # say "hi"\n b "x # y" c }') == '{a b"x # y"c}'
+
+
+def test_minimize_query_is_idempotent():
+    from gqlspection.introspection_query import build_introspection_query
+
+    minimized = minimize_query(build_introspection_query(directives=True))
+    assert minimize_query(minimized) == minimized
+    assert '#' not in minimized and '\n' not in minimized